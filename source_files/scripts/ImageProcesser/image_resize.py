@@ -1,17 +1,150 @@
 from PIL import Image
+import io
 import os
+import sys
+import time
 import argparse
 
-def convert_image_for_youtube(input_image, output_image, resize_x = 1280, resize_y = 720, output_format="JPEG"):
+# YouTube rejects custom thumbnails larger than 2 MB.
+YOUTUBE_THUMBNAIL_MAX_BYTES = 2 * 1024 * 1024
+FIT_MODES = ["stretch", "letterbox", "crop"]
+# Decoded images are shrunk to no less than this multiple of the target before the final LANCZOS resize
+# (the same gap fit_image passes to resize, so quality matches a resize of the full image).
+REDUCING_GAP = 3.0
+# Modes Image.reduce() averages directly; anything else (palette, alpha) is converted to RGB first.
+REDUCIBLE_MODES = ("RGB", "L")
+
+# -------------------------------
+# Decode
+# -------------------------------
+def open_scaled(input_image, target_size):
+    """
+    Opens an image decoded at the smallest resolution that still covers target_size, as RGB.
+    - JPEGs use draft mode, so the decoder itself scales by 1/2, 1/4 or 1/8
+    - RGB/greyscale images are shrunk with an integer reduce() before the RGB conversion, and an
+      RGB image is never copied, so only one full-resolution buffer exists at a time
+    - Returns (image, full size); the file is closed before returning
+    """
+    with Image.open(input_image) as img:
+        full_size = img.size
+        if img.format == "JPEG":
+            img.draft("RGB", target_size)
+        if img.mode not in REDUCIBLE_MODES:
+            img = img.convert("RGB")
+        factor = int(min(img.width / (target_size[0] * REDUCING_GAP), img.height / (target_size[1] * REDUCING_GAP)))
+        if factor > 1:
+            img = img.reduce(factor)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.load()
+    return img, full_size
+
+def fit_image(img, size, fit="stretch", background=(0, 0, 0)):
+    """
+    Resizes to exactly `size`.
+    - stretch: ignore aspect ratio (previous behaviour)
+    - letterbox: fit inside and pad with `background`
+    - crop: fill the frame and centre-crop the overflow
+    """
+    width, height = size
+    if fit == "stretch":
+        return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    scale = min(width / img.width, height / img.height) if fit == "letterbox" else max(width / img.width, height / img.height)
+    scaled_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    scaled = img.resize(scaled_size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    if fit == "letterbox":
+        canvas = Image.new("RGB", size, background)
+        canvas.paste(scaled, ((width - scaled.width) // 2, (height - scaled.height) // 2))
+        return canvas
+
+    left = (scaled.width - width) // 2
+    top = (scaled.height - height) // 2
+    return scaled.crop((left, top, left + width, top + height))
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB (None where the resource module is missing, e.g. Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+# -------------------------------
+# Encode
+# -------------------------------
+def encode_under_limit(img, max_bytes, output_format="JPEG", min_quality=40, max_quality=95):
+    """
+    Binary-searches the highest JPEG quality whose encoding fits in max_bytes (all in memory).
+    Returns (bytes, quality).
+    """
+    best = None
+    low, high = min_quality, max_quality
+    while low <= high:
+        quality = (low + high) // 2
+        buffer = io.BytesIO()
+        img.save(buffer, format=output_format, quality=quality, optimize=True)
+        if buffer.tell() <= max_bytes:
+            best = (buffer.getvalue(), quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    if best is None:
+        raise ValueError(f"Cannot encode under {max_bytes} bytes even at quality {min_quality}")
+    return best
+
+def render_youtube_variants(input_image, variants, fit="stretch"):
+    """
+    Produces several outputs from a single decode of input_image.
+    - variants: dicts with "output", "size" (w, h) and optional "format", "fit", "max_bytes"
+    - max_bytes triggers an in-memory quality search (e.g. thumbnails under 2 MB)
+    - Returns a list of (output, bytes written)
+    """
+    start = time.perf_counter()
+    largest = (max(v["size"][0] for v in variants), max(v["size"][1] for v in variants))
+    img, full_size = open_scaled(input_image, largest)
+    decoded_mb = img.width * img.height * 3 / 1024 ** 2
+    full_mb = full_size[0] * full_size[1] * 3 / 1024 ** 2
+
+    written = []
+    for variant in variants:
+        output_format = variant.get("format", "JPEG")
+        resized = fit_image(img, tuple(variant["size"]), variant.get("fit", fit))
+        if variant.get("max_bytes"):
+            data, quality = encode_under_limit(resized, variant["max_bytes"], output_format)
+            with open(variant["output"], "wb") as f:
+                f.write(data)
+            print(f"✅ {variant['output']} ({len(data) / 1024:.0f} KB at quality {quality})")
+        else:
+            resized.save(variant["output"], format=output_format)
+            print(f"✅ {variant['output']}")
+        written.append((variant["output"], os.path.getsize(variant["output"])))
+
+    peak_mb = peak_rss_mb()
+    peak = f", peak RSS {peak_mb:.0f} MB" if peak_mb is not None else ""
+    print(f"⏱️ {input_image}: decoded {img.width}x{img.height} ({decoded_mb:.1f} MB) of {full_size[0]}x{full_size[1]} "
+          f"({full_mb:.1f} MB), {len(variants)} variants in {time.perf_counter() - start:.2f}s{peak}")
+    return written
+
+def prepare_youtube_frame(input_image, resize_x=1280, resize_y=720, fit="stretch"):
+    """
+    Decodes and resizes the picture once and returns the frame in memory,
+    ready to hand to create_video without a JPEG round trip.
+    """
+    img, _ = open_scaled(input_image, (resize_x, resize_y))
+    return fit_image(img, (resize_x, resize_y), fit)
+
+def convert_image_for_youtube(input_image, output_image, resize_x = 1280, resize_y = 720, output_format="JPEG", fit="stretch"):
     """
     Convert an image to YouTube-friendly format (JPEG, 1280x720).
     """
     try:
-        img = Image.open(input_image)
-        # Resize to 1280x720 (16:9)
-        img = img.resize((resize_x, resize_y), Image.Resampling.LANCZOS)
-        # Save as JPEG
-        img.save(output_image, format=output_format)
+        render_youtube_variants(input_image, [{"output": output_image, "size": (resize_x, resize_y), "format": output_format}], fit=fit)
         print(f"✅ Converted {input_image} → {output_image}")
     except Exception as e:
         print("❌ Error converting image:", e)
@@ -23,6 +156,8 @@ def main():
     parser.add_argument("output_image_name", help="Path to save the converted image file.")
     parser.add_argument("--width", type=int, default=1280, help="Width of the output image (default: 1280).")
     parser.add_argument("--height", type=int, default=720, help="Height of the output image (default: 720).")
+    parser.add_argument("--fit", choices=FIT_MODES, default="stretch", help="How to handle a different aspect ratio (default: stretch).")
+    parser.add_argument("--variants", action="store_true", help="Also write a 1080p frame and a thumbnail under 2 MB from the same decode.")
     args = parser.parse_args()
 
     data_rel_path = os.path.join('..', '..', 'data', args.song_name)
@@ -31,7 +166,16 @@ def main():
     args.input_image =  os.path.join(data_rel_path, args.input_image_name)
     args.output_image = os.path.join(output_rel_path, args.output_image_name)
 
-    convert_image_for_youtube(args.input_image, args.output_image, args.width, args.height)
+    if not args.variants:
+        convert_image_for_youtube(args.input_image, args.output_image, args.width, args.height, fit=args.fit)
+        return
+
+    base_name = os.path.splitext(args.output_image)[0]
+    render_youtube_variants(args.input_image, [
+        {"output": args.output_image, "size": (args.width, args.height)},
+        {"output": f"{base_name}_1080p.jpg", "size": (1920, 1080)},
+        {"output": f"{base_name}_thumbnail.jpg", "size": (1280, 720), "max_bytes": YOUTUBE_THUMBNAIL_MAX_BYTES},
+    ], fit=args.fit)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
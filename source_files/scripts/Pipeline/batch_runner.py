@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Pipeline.song_job import (
+    STAGES, CPU_STAGES, build_song_job, plan_song_stages, run_stages, stage_quota_cost, publish_priority
+)
+
+# -------------------------------
+# Worker
+# -------------------------------
+def run_cpu_stages(job, stages):
+    """
+    Runs the CPU-bound stages for one song inside a worker process.
+    Returns (timings, error) – exceptions never escape the worker.
+    """
+    _, timings, error = run_stages(job, stages)
+    return timings, error
+
+def default_worker_count():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def schedule_by_quota(jobs, plans, results):
+    """
+    Admits songs whose whole remaining API cost fits in today's quota, earliest publishAtIST first.
+    Deferred songs are marked in results and their plans emptied.
+    """
+    from Utilities.quota_scheduler import admit_jobs, remaining_quota
+
+    candidates = [
+        {"name": name, "cost": stage_quota_cost(plans[name], jobs[name]), "priority": publish_priority(jobs[name])}
+        for name in jobs if plans[name]
+    ]
+    remaining = remaining_quota()
+    admitted, deferred = admit_jobs(candidates)
+    for job in deferred:
+        plans[job["name"]] = []
+        results[job["name"]].update(status="deferred", error=f"needs {job['cost']} quota units; deferred to the next quota window")
+    print(f"📊 Quota: {remaining} units left today; admitted {len(admitted)} songs "
+          f"({sum(j['cost'] for j in admitted)} units), deferred {len(deferred)}")
+    return [job["name"] for job in admitted]
+
+# -------------------------------
+# Batch Orchestrator
+# -------------------------------
+def run_batch(song_names, options=None, workers=None):
+    """
+    Processes many songs.
+    - convert_image/create_video run in a bounded process pool
+    - the network stages then run per song in this process
+    - each song resumes from its manifest (or options from_stage/only_stage)
+    - a failing song never stops the others
+    - Returns a list of per-song result dicts
+    """
+    options = options or {}
+    workers = workers or default_worker_count()
+    jobs = {name: build_song_job(name, options) for name in song_names}
+    results = {name: {"song_name": name, "status": "ok", "error": None, "timings": {}} for name in song_names}
+    plans = {}
+    for name, job in jobs.items():
+        plans[name] = plan_song_stages(job, options.get("from_stage"), options.get("only_stage"))
+        if not plans[name]:
+            results[name]["status"] = "done"
+    # Admitted songs run in publish order; deferred ones keep an empty plan
+    run_order = song_names if options.get("ignore_quota") else schedule_by_quota(jobs, plans, results)
+
+    encode_jobs = {name: [s for s in plans[name] if s in CPU_STAGES] for name in run_order}
+    encode_jobs = {name: stages for name, stages in encode_jobs.items() if stages}
+
+    print(f"🎬 Encoding {len(encode_jobs)} songs with {workers} worker processes...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_cpu_stages, jobs[name], stages): name for name, stages in encode_jobs.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                timings, error = future.result()
+            except Exception as e:
+                # Worker process crashed (e.g. killed by the OS)
+                timings, error = {}, f"worker: {e}"
+            results[name]["timings"].update(timings)
+            if error:
+                results[name].update(status="failed", error=error)
+                print(f"❌ {name}: {error}")
+
+    for name in run_order:
+        network_stages = [s for s in plans[name] if s not in CPU_STAGES]
+        if results[name]["status"] != "ok" or not network_stages:
+            continue
+        print(f"\n▶️ {name}")
+        _, timings, error = run_stages(jobs[name], network_stages)
+        results[name]["timings"].update(timings)
+        if error:
+            results[name].update(status="failed", error=error)
+            print(f"❌ {name}: {error}")
+
+    summary = [results[name] for name in song_names]
+    print_summary(summary)
+    return summary
+
+def print_summary(results, stages=STAGES):
+    """
+    Prints one row per song with its outcome and per-stage seconds.
+    """
+    name_width = max([len("song")] + [len(r["song_name"]) for r in results])
+    header = f"{'song':<{name_width}}  {'status':<7}" + "".join(f"  {stage[:10]:>10}" for stage in stages)
+    print("\n" + header)
+    print("-" * len(header))
+    for result in results:
+        cells = []
+        for stage in stages:
+            seconds = result["timings"].get(stage)
+            cells.append(f"  {seconds:>10.1f}" if seconds is not None else f"  {'-':>10}")
+        print(f"{result['song_name']:<{name_width}}  {result['status']:<7}" + "".join(cells))
+    for result in results:
+        if result["error"]:
+            print(f"  {result['song_name']}: {result['error']}")
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that cost hundreds of milliseconds (or a login) and must only load inside a stage.
+HEAVY_MODULES = ["moviepy", "numpy", "PIL", "googleapiclient", "google.genai", "google_auth_oauthlib",
+                 "youtube_transcript_api", "Utilities.get_credentials"]
+DEFAULT_BUDGET_SECONDS = 0.5
+
+# -------------------------------
+# Measurement
+# -------------------------------
+def parse_importtime(stderr_text):
+    """
+    Parses `python -X importtime` output into {module: cumulative microseconds}.
+    """
+    modules = {}
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+def measure_startup(args=("--help",), script="main.py"):
+    """
+    Runs `python -X importtime <script> <args>` and returns
+    (wall seconds, {module: cumulative microseconds}).
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script, *args],
+        cwd=SCRIPT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    wall_seconds = time.perf_counter() - start
+    return wall_seconds, parse_importtime(result.stderr)
+
+def heavy_imports(modules):
+    return sorted(name for name in modules if any(name == heavy or name.startswith(heavy + ".") for heavy in HEAVY_MODULES))
+
+# -------------------------------
+# Benchmark
+# -------------------------------
+def run_benchmark(args=("--help",), budget_seconds=DEFAULT_BUDGET_SECONDS, top=10):
+    """
+    Prints the slowest imports of a CLI start and returns False on a regression:
+    a heavy module imported at startup or a wall time over budget.
+    """
+    wall_seconds, modules = measure_startup(args)
+    print(f"⏱️ main.py {' '.join(args)}: {wall_seconds * 1000:.0f} ms wall (budget {budget_seconds * 1000:.0f} ms)")
+    for name, micros in sorted(modules.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {micros / 1000:>8.1f} ms  {name}")
+
+    ok = True
+    heavy = heavy_imports(modules)
+    if heavy:
+        print(f"❌ Imported at startup: {', '.join(heavy)}")
+        ok = False
+    if wall_seconds > budget_seconds:
+        print("❌ Startup is over budget")
+        ok = False
+    if ok:
+        print("✅ Startup is lazy and within budget")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure main.py startup time with python -X importtime.")
+    parser.add_argument("--budget_ms", type=int, default=int(DEFAULT_BUDGET_SECONDS * 1000), help="Allowed wall time in ms (default: 500).")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list (default: 10).")
+    parser.add_argument("main_args", nargs="*", default=["--help"], help="Arguments passed to main.py (default: --help).")
+    args = parser.parse_args()
+    return 0 if run_benchmark(args.main_args, args.budget_ms / 1000, args.top) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from Pipeline.song_job import (
+    SCRIPT_DIR, build_song_job, discover_songs, plan_song_stages, stage_input_hashes, stage_artifacts, build_language_tracks
+)
+from Pipeline.manifest import load_manifest, save_manifest, record_stage
+from Utilities.llm_cache import ResponseCache, count
+from Utilities.llm_usage import measure_call, record_call
+from SubtitleHandler.subtitle_generator import (
+    call_gemini, get_gemini_client, load_subtitle_prompt, save_generated_subtitles
+)
+from SubtitleHandler.lyric_aligner import align_subtitles
+from SubtitleHandler.subtitle_track import SubtitleTrack
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+BATCH_ROOT = os.path.join(SCRIPT_DIR, '..', 'cache', 'llm_batches')
+DEFAULT_POLL_SECONDS = 60
+# Terminal states of a Gemini batch job.
+FINISHED_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+# -------------------------------
+# Backends
+# -------------------------------
+class GeminiBatchBackend:
+    """
+    Gemini Batch API: the job file is uploaded once and processed offline, at a lower price per request.
+    """
+    name = "gemini"
+
+    def _client(self):
+        return get_gemini_client()
+
+    def submit(self, requests_file, model_name, display_name):
+        client = self._client()
+        uploaded = client.files.upload(file=requests_file, config={"display_name": display_name, "mime_type": "jsonl"})
+        job = client.batches.create(model=model_name, src=uploaded.name, config={"display_name": display_name})
+        return job.name
+
+    def state(self, job_name):
+        return self._client().batches.get(name=job_name).state.name
+
+    def download_results(self, job_name, results_file):
+        client = self._client()
+        job = client.batches.get(name=job_name)
+        with open(results_file, "wb") as f:
+            f.write(client.files.download(file=job.dest.file_name))
+
+class LocalBatchBackend:
+    """
+    Local stand-in with the same interface: runs the job file through generate_fn on a thread pool
+    when it is submitted and writes the results in the provider's format.
+    """
+    name = "local"
+
+    def __init__(self, generate_fn=call_gemini, max_concurrency=4):
+        self.generate_fn = generate_fn
+        self.max_concurrency = max_concurrency
+
+    def _run_request(self, model_name, line):
+        request = json.loads(line)
+        prompt = "".join(part["text"] for part in request["request"]["contents"][0]["parts"])
+        try:
+            text, stats = measure_call(self.generate_fn, model_name, prompt)
+        except Exception as e:
+            return {"key": request["key"], "error": {"message": str(e)}}
+        return {"key": request["key"], "response": {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}],
+            "usageMetadata": {"promptTokenCount": stats["prompt_tokens"], "candidatesTokenCount": stats["output_tokens"]},
+        }}
+
+    def submit(self, requests_file, model_name, display_name):
+        with open(requests_file, "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            results = list(pool.map(lambda line: self._run_request(model_name, line), lines))
+        results_file = os.path.join(os.path.dirname(requests_file), "local_results.jsonl")
+        with open(results_file, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+        return results_file
+
+    def state(self, job_name):
+        return "JOB_STATE_SUCCEEDED" if os.path.exists(job_name) else "JOB_STATE_FAILED"
+
+    def download_results(self, job_name, results_file):
+        shutil.copyfile(job_name, results_file)
+
+def get_backend(name):
+    return LocalBatchBackend() if name == "local" else GeminiBatchBackend()
+
+# -------------------------------
+# Batch files
+# -------------------------------
+def batch_request(key, prompt):
+    """
+    One line of the job file (GenerateContentRequest keyed by song).
+    """
+    return {"key": key, "request": {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}}
+
+def response_text(result):
+    """
+    (text, usage) from one line of the results file; raises for a failed request.
+    """
+    if "error" in result:
+        raise RuntimeError(f"Batch request failed: {result['error'].get('message', result['error'])}")
+    response = result["response"]
+    parts = response["candidates"][0]["content"]["parts"]
+    usage = response.get("usageMetadata") or {}
+    return "".join(part.get("text", "") for part in parts), {
+        "seconds": None, "prompt_tokens": usage.get("promptTokenCount"), "output_tokens": usage.get("candidatesTokenCount")}
+
+def load_batch(batch_dir):
+    with open(os.path.join(batch_dir, "batch.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_batch(batch_dir, batch):
+    path = os.path.join(batch_dir, "batch.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(batch, f, indent=2, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+def latest_batch_dir(batch_root=BATCH_ROOT):
+    names = sorted(name for name in os.listdir(batch_root) if os.path.isdir(os.path.join(batch_root, name))) if os.path.isdir(batch_root) else []
+    if not names:
+        raise RuntimeError(f"No batches under {batch_root}")
+    return os.path.join(batch_root, names[-1])
+
+# -------------------------------
+# Songs
+# -------------------------------
+def complete_song(job, input_hashes, write_fn, error=None):
+    """
+    Runs write_fn() (writes the English SRT, returns its cue count), builds the other caption
+    languages and records the regenerate_subtitles stage in the song's manifest.
+    Returns a result dict (song_name, status, cues, error).
+    """
+    cues = 0
+    if error is None:
+        try:
+            cues = write_fn()
+            build_language_tracks(job)
+        except Exception as e:
+            error = str(e)
+    manifest = load_manifest(job["output_dir"], job["song_name"])
+    if error:
+        record_stage(manifest, "regenerate_subtitles", "failed", input_hashes, [], error=error)
+    else:
+        record_stage(manifest, "regenerate_subtitles", "done", input_hashes, stage_artifacts(job, "regenerate_subtitles"))
+    save_manifest(job["output_dir"], manifest)
+    return {"song_name": job["song_name"], "status": "failed" if error else "ok", "cues": cues, "error": error}
+
+def finish_song(job, input_hashes, raw_output, prompt_encoding, error=None):
+    """
+    Validates and writes one song's model output; see complete_song.
+    """
+    return complete_song(job, input_hashes, lambda: save_generated_subtitles(
+        raw_output, job["regenerated_captions_file_en"], prompt_encoding), error=error)
+
+def align_song(job, input_hashes):
+    """
+    Times the lyrics against the captions locally, as regenerate_english_subtitles does.
+    Returns the finished result, or None when the alignment is not confident and the song needs the model.
+    """
+    report = align_subtitles(job["downloaded_captions_file"], job["input_lyrics_file"], job["regenerated_captions_file_en"])
+    if not report["ok"]:
+        print(f"🤖 {job['song_name']}: alignment is not confident; batching it for the model")
+        return None
+    return complete_song(job, input_hashes, lambda: len(SubtitleTrack.read(job["regenerated_captions_file_en"])))
+
+def pending_jobs(song_names, options=None):
+    """
+    Songs whose captions are downloaded and whose regenerate_subtitles stage is due.
+    """
+    options = options or {}
+    jobs = []
+    for name in song_names:
+        job = build_song_job(name, options)
+        if not os.path.exists(job["downloaded_captions_file"]):
+            print(f"⏭️ {name}: no downloaded captions yet")
+            continue
+        if options.get("force") or "regenerate_subtitles" in plan_song_stages(job):
+            jobs.append(job)
+    return jobs
+
+# -------------------------------
+# Submit / wait / collect
+# -------------------------------
+def submit_batch(jobs, backend, model_name=DEFAULT_MODEL, prompt_encoding="srt", use_cache=True, batch_root=BATCH_ROOT):
+    """
+    Collects the prompts of many songs into one job file and submits it.
+    - Songs with subtitle_engine "align" are aligned locally first; only those the aligner cannot place are batched
+    - Songs whose prompt is already in the LLM response cache are finished at once, not batched
+    - Everything needed to fan the results out later is saved in <batch_dir>/batch.json
+    - Returns (batch_dir, results of the songs finished from the cache)
+    """
+    batch_id = base_id = time.strftime("%Y%m%d-%H%M%S")
+    suffix = 1
+    while os.path.exists(os.path.join(batch_root, batch_id)):
+        batch_id = f"{base_id}-{suffix}"
+        suffix += 1
+    batch_dir = os.path.join(batch_root, batch_id)
+    os.makedirs(batch_dir)
+    cache = ResponseCache() if use_cache else None
+    batch = {"id": batch_id, "backend": backend.name, "model": model_name, "prompt_encoding": prompt_encoding,
+             "use_cache": use_cache, "job_name": None, "state": None, "songs": {}}
+    finished = []
+    requests_file = os.path.join(batch_dir, "requests.jsonl")
+    with open(requests_file, "w", encoding="utf-8") as f:
+        for job in jobs:
+            input_hashes = stage_input_hashes(job, "regenerate_subtitles")
+            if job["subtitle_engine"] == "align":
+                aligned = align_song(job, input_hashes)
+                if aligned:
+                    finished.append(aligned)
+                    continue
+            prompt, _ = load_subtitle_prompt(job["downloaded_captions_file"], job["input_lyrics_file"], job["input_prompt_file"], prompt_encoding)
+            cached_output = cache.get(model_name, prompt) if cache else None
+            if cached_output is not None:
+                record_call(job["llm_usage_log"], job["song_name"], model_name, prompt_encoding, prompt, {}, True)
+                finished.append(finish_song(job, input_hashes, cached_output, prompt_encoding))
+                continue
+            if not cache:
+                count("bypassed")
+            f.write(json.dumps(batch_request(job["song_name"], prompt), ensure_ascii=False) + "\n")
+            batch["songs"][job["song_name"]] = {"job": job, "input_hashes": input_hashes, "prompt": prompt}
+
+    if batch["songs"]:
+        batch["job_name"] = backend.submit(requests_file, model_name, f"subtitles-{batch_id}")
+        print(f"⬆️ Submitted {len(batch['songs'])} songs as batch {batch['job_name']} ({len(finished)} answered from the cache)")
+    else:
+        batch["state"] = "JOB_STATE_SUCCEEDED"
+        print(f"✅ Nothing to submit ({len(finished)} songs aligned or answered from the cache)")
+    save_batch(batch_dir, batch)
+    return batch_dir, finished
+
+def wait_for_batch(batch_dir, backend, poll_seconds=DEFAULT_POLL_SECONDS, timeout_seconds=None):
+    """
+    Polls the one batch job until it finishes (or the timeout passes); returns its state.
+    """
+    batch = load_batch(batch_dir)
+    if not batch["job_name"]:
+        return batch["state"]
+    started_at = time.monotonic()
+    while True:
+        state = backend.state(batch["job_name"])
+        if state in FINISHED_STATES:
+            break
+        if timeout_seconds is not None and time.monotonic() - started_at > timeout_seconds:
+            break
+        print(f"🔄 Batch {batch['id']}: {state}; checking again in {poll_seconds}s")
+        time.sleep(poll_seconds)
+    batch["state"] = state
+    save_batch(batch_dir, batch)
+    return state
+
+def collect_batch(batch_dir, backend):
+    """
+    Fans a finished batch out to output/<song>/: validates each song's response, writes its SRT,
+    stores the response in the LLM cache and records usage and the manifest stage.
+    Returns one result dict per batched song.
+    """
+    batch = load_batch(batch_dir)
+    if not batch["songs"]:
+        return []
+    if batch["state"] != "JOB_STATE_SUCCEEDED":
+        raise RuntimeError(f"Batch {batch['id']} is {batch['state']}, not succeeded")
+    results_file = os.path.join(batch_dir, "results.jsonl")
+    backend.download_results(batch["job_name"], results_file)
+
+    cache = ResponseCache() if batch["use_cache"] else None
+    results = {}
+    with open(results_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            song = batch["songs"].get(result.get("key"))
+            if song is None:
+                continue
+            job = song["job"]
+            try:
+                text, stats = response_text(result)
+            except (RuntimeError, KeyError, IndexError) as e:
+                results[job["song_name"]] = finish_song(job, song["input_hashes"], None, batch["prompt_encoding"], error=str(e))
+                continue
+            record_call(job["llm_usage_log"], job["song_name"], batch["model"], batch["prompt_encoding"], song["prompt"], stats, False)
+            results[job["song_name"]] = finish_song(job, song["input_hashes"], text, batch["prompt_encoding"])
+            if cache and results[job["song_name"]]["status"] == "ok":
+                cache.put(batch["model"], song["prompt"], text)
+
+    for name, song in batch["songs"].items():
+        if name not in results:
+            results[name] = finish_song(song["job"], song["input_hashes"], None, batch["prompt_encoding"], error="missing from the batch results")
+    return [results[name] for name in batch["songs"]]
+
+def run_catalog_batch(jobs, backend, model_name=DEFAULT_MODEL, prompt_encoding="srt", use_cache=True,
+                      poll_seconds=DEFAULT_POLL_SECONDS, batch_root=BATCH_ROOT):
+    """
+    submit_batch + wait_for_batch + collect_batch in one go; returns the per-song results.
+    """
+    batch_dir, finished = submit_batch(jobs, backend, model_name, prompt_encoding, use_cache, batch_root)
+    state = wait_for_batch(batch_dir, backend, poll_seconds)
+    if state != "JOB_STATE_SUCCEEDED":
+        raise RuntimeError(f"Batch {os.path.basename(batch_dir)} ended in {state}")
+    return finished + collect_batch(batch_dir, backend)
+
+def print_results(results):
+    name_width = max([len("song")] + [len(r["song_name"]) for r in results])
+    print(f"\n{'song':<{name_width}}  {'status':<7}  {'cues':>5}")
+    for result in results:
+        print(f"{result['song_name']:<{name_width}}  {result['status']:<7}  {result['cues']:>5}"
+              + (f"  {result['error']}" if result["error"] else ""))
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the subtitles of many songs as one offline Gemini batch job.")
+    parser.add_argument("command", choices=["run", "submit", "status", "collect"], help="run: submit, wait and collect; submit: only submit; status: show the batch state; collect: wait for the batch and write the subtitles.")
+    parser.add_argument("song_name", nargs="*", help="Songs to batch (for run/submit).")
+    parser.add_argument("--all", action="store_true", help="Batch every song under data/ whose captions are downloaded.")
+    parser.add_argument("--batch_dir", help="Batch to check or collect (default: the latest one under cache/llm_batches).")
+    parser.add_argument("--backend", choices=["gemini", "local"], default="gemini", help="'gemini' uses the Batch API (default); 'local' runs the same job file with ordinary calls.")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Gemini model (default: {DEFAULT_MODEL}).")
+    parser.add_argument("--prompt_encoding", choices=["compact", "srt"], default="srt", help="How captions are put into the prompts (default: srt; compact is experimental).")
+    parser.add_argument("--poll_seconds", type=int, default=DEFAULT_POLL_SECONDS, help="Seconds between checks of the batch state (default: 60).")
+    parser.add_argument("--no_llm_cache", action="store_true", help="Batch every song even if its prompt has a cached response.")
+    parser.add_argument("--force", action="store_true", help="Also batch songs whose regenerate_subtitles stage is up to date.")
+    parser.add_argument("--subtitle_engine", choices=["align", "llm"], default="align", help="'align' aligns each song locally and only batches the ones it cannot place (default); 'llm' batches every song.")
+    parser.add_argument("--caption_languages", nargs="+", default=["en"], help="Caption tracks to build for each song, as in main.py (default: en).")
+    args = parser.parse_args()
+
+    if args.command in ("run", "submit"):
+        song_names = discover_songs() if args.all else args.song_name
+        if not song_names:
+            parser.error("give at least one song_name, or --all")
+        jobs = pending_jobs(song_names, {"force": args.force, "subtitle_engine": args.subtitle_engine,
+                                         "caption_languages": args.caption_languages, "prompt_encoding": args.prompt_encoding})
+        backend = get_backend(args.backend)
+        if args.command == "submit":
+            batch_dir, finished = submit_batch(jobs, backend, args.model, args.prompt_encoding, not args.no_llm_cache)
+            print(f"Batch saved in {batch_dir}")
+            results = finished
+        else:
+            results = run_catalog_batch(jobs, backend, args.model, args.prompt_encoding, not args.no_llm_cache, args.poll_seconds)
+    else:
+        batch_dir = args.batch_dir or latest_batch_dir()
+        batch = load_batch(batch_dir)
+        backend = get_backend(batch["backend"])
+        if args.command == "status":
+            state = backend.state(batch["job_name"]) if batch["job_name"] else batch["state"]
+            print(f"Batch {batch['id']} ({len(batch['songs'])} songs, {batch['backend']}): {state}")
+            return 0
+        state = wait_for_batch(batch_dir, backend, args.poll_seconds)
+        if state != "JOB_STATE_SUCCEEDED":
+            print(f"❌ Batch {batch['id']} ended in {state}")
+            return 1
+        results = collect_batch(batch_dir, backend)
+
+    print_results(results)
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
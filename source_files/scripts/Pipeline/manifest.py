@@ -0,0 +1,89 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from Utilities.render_cache import hash_file
+
+MANIFEST_NAME = "pipeline_manifest.json"
+
+# -------------------------------
+# Load / Save
+# -------------------------------
+def manifest_path(output_dir):
+    return os.path.join(output_dir, MANIFEST_NAME)
+
+def load_manifest(output_dir, song_name=None):
+    """
+    Reads output/<song>/pipeline_manifest.json, or returns an empty manifest.
+    """
+    path = manifest_path(output_dir)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Ignoring corrupt manifest {path}: {e}")
+    return {"song_name": song_name, "video_id": None, "stages": {}}
+
+def save_manifest(output_dir, manifest):
+    os.makedirs(output_dir, exist_ok=True)
+    path = manifest_path(output_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+# -------------------------------
+# Stage records
+# -------------------------------
+def hash_inputs(paths, params=None):
+    """
+    Maps each existing input path to its SHA-256; missing inputs map to None.
+    - params (the job options that change the stage's output) are hashed under the "params" key
+    """
+    hashes = {path: hash_file(path) if os.path.exists(path) else None for path in paths}
+    if params is not None:
+        hashes["params"] = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+    return hashes
+
+def record_stage(manifest, stage, status, input_hashes, artifacts, error=None):
+    manifest["stages"][stage] = {
+        "status": status,
+        "input_hashes": input_hashes,
+        "artifacts": artifacts,
+        "error": error,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def stage_is_current(manifest, stage, input_paths, artifact_paths=None, params=None):
+    """
+    A stage is current when it finished, its inputs and params still hash the same and its artifacts still exist.
+    - artifact_paths: what the stage would produce now (e.g. one SRT per configured caption language);
+      these must exist as well as the ones recorded
+    - params: the job options the stage was run with (see hash_inputs)
+    """
+    record = manifest["stages"].get(stage)
+    if not record or record["status"] != "done":
+        return False
+    if record["input_hashes"] != hash_inputs(input_paths, params):
+        return False
+    return all(os.path.exists(path) for path in record["artifacts"] + list(artifact_paths or []))
+
+def plan_stages(manifest, stages, stage_inputs, from_stage=None, only_stage=None, stage_artifacts=None, stage_params=None):
+    """
+    Chooses which stages to run.
+    - only_stage: just that stage
+    - from_stage: that stage and everything after it
+    - otherwise: everything from the first incomplete or invalidated stage
+    """
+    if only_stage:
+        return [only_stage]
+    if from_stage:
+        return stages[stages.index(from_stage):]
+    for index, stage in enumerate(stages):
+        artifacts = stage_artifacts(stage) if stage_artifacts else None
+        params = stage_params(stage) if stage_params else None
+        if not stage_is_current(manifest, stage, stage_inputs(stage), artifacts, params):
+            return stages[index:]
+    return []
@@ -0,0 +1,417 @@
+import os
+import json
+import time
+
+from Utilities.render_cache import cached_render, unlink_output
+from Pipeline.manifest import load_manifest, save_manifest, hash_inputs, record_stage, plan_stages
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_ROOT = os.path.join(SCRIPT_DIR, '..', 'data')
+OUTPUT_ROOT = os.path.join(SCRIPT_DIR, '..', 'output')
+
+DEFAULT_FILE_NAMES = {
+    "audio_file_name": "audio.mp3",
+    "image_file_name": "image.png",
+    "metadata_file_name": "metadata.json",
+    "lyrics_file_name": "lyrics.txt",
+    "prompt_file_name": "subtitle_generator_prompt.txt",
+}
+
+# Stages in pipeline order; the first two are CPU-bound, the rest talk to YouTube/Gemini.
+STAGES = ["convert_image", "create_video", "upload_video", "download_captions", "regenerate_subtitles", "upload_subtitles"]
+CPU_STAGES = ["convert_image", "create_video"]
+
+# YouTube Data API calls each stage makes (download_captions toggles privacy twice).
+STAGE_API_CALLS = {
+    "upload_video": ["videos.insert"],
+    "download_captions": ["videos.list", "videos.update", "videos.update"],
+    "upload_subtitles": ["captions.insert"],
+}
+
+# -------------------------------
+# Song discovery and paths
+# -------------------------------
+def discover_songs(data_root=DATA_ROOT):
+    """
+    Returns every song folder under data/ (sorted), skipping hidden folders.
+    """
+    if not os.path.isdir(data_root):
+        return []
+    return sorted(
+        name for name in os.listdir(data_root)
+        if not name.startswith(".") and os.path.isdir(os.path.join(data_root, name))
+    )
+
+def build_song_job(song_name, options=None):
+    """
+    Builds the input/output paths for one song.
+    - options may override any of DEFAULT_FILE_NAMES and set video_engine/subtitle_engine
+    - Returns a plain dict so it can be sent to worker processes
+    """
+    options = options or {}
+    names = {key: options.get(key) or default for key, default in DEFAULT_FILE_NAMES.items()}
+
+    data_dir = os.path.join(DATA_ROOT, song_name)
+    output_dir = os.path.join(OUTPUT_ROOT, song_name)
+    base_image_name = os.path.splitext(os.path.basename(names["image_file_name"]))[0]
+
+    return {
+        "song_name": song_name,
+        "data_dir": data_dir,
+        "output_dir": output_dir,
+        "video_engine": options.get("video_engine") or "still",
+        "video_workers": options.get("video_workers"),
+        "image_fit": options.get("image_fit") or "stretch",
+        "write_frame_jpeg": bool(options.get("write_frame_jpeg")),
+        "stream_upload": bool(options.get("stream_upload")),
+        "use_cache": not options.get("no_cache"),
+        "subtitle_engine": options.get("subtitle_engine") or "align",
+        "use_llm_cache": not options.get("no_llm_cache"),
+        "stream_llm": bool(options.get("stream_llm")),
+        "llm_window_seconds": options.get("llm_window_seconds"),
+        "prompt_encoding": options.get("prompt_encoding") or "srt",
+        "caption_languages": list(options.get("caption_languages") or ["en"]),
+        "input_audio_file": os.path.join(data_dir, names["audio_file_name"]),
+        "input_image_file": os.path.join(data_dir, names["image_file_name"]),
+        "input_metadata_file": os.path.join(data_dir, names["metadata_file_name"]),
+        "input_lyrics_file": os.path.join(data_dir, names["lyrics_file_name"]),
+        "input_prompt_file": os.path.join(SCRIPT_DIR, names["prompt_file_name"]),
+        "output_image_file": os.path.join(output_dir, f"{base_image_name}_yt.jpg"),
+        "output_video_file": os.path.join(output_dir, f"{song_name}.mp4"),
+        "downloaded_captions_file": os.path.join(output_dir, f"{song_name}_downloaded_captions.srt"),
+        "regenerated_captions_file_en": os.path.join(output_dir, f"{song_name}_regenerated_en_captions.srt"),
+        "llm_usage_log": os.path.join(output_dir, "llm_usage.jsonl"),
+    }
+
+def stage_inputs(job, stage):
+    """
+    Files whose content decides whether a finished stage is still valid.
+    """
+    return {
+        "convert_image": [job["input_image_file"]],
+        "create_video": [job["input_image_file"], job["input_audio_file"]],
+        "upload_video": ([job["input_image_file"], job["input_audio_file"], job["input_metadata_file"]] if job["stream_upload"]
+                         else [job["output_video_file"], job["input_metadata_file"]]),
+        "download_captions": [],
+        "regenerate_subtitles": [job["downloaded_captions_file"], job["input_lyrics_file"], job["input_prompt_file"]],
+        "upload_subtitles": list(caption_track_files(job).values()),
+    }[stage]
+
+def render_params(job, stage):
+    """
+    Everything besides the input files that changes a rendered image or video (the render cache key).
+    """
+    if stage == "convert_image":
+        return {"width": 1280, "height": 720, "format": "JPEG", "fit": job["image_fit"]}
+    from VideoGenerate.video_generate import video_render_params
+
+    params = video_render_params(engine=job["video_engine"], extra_seconds=2)
+    params.update(width=1280, height=720, fit=job["image_fit"])
+    return params
+
+def stage_params(job, stage):
+    """
+    Job options that change what a stage produces. They are hashed with the stage inputs, so a
+    resumed run with other options redoes the stage; None for stages no option affects.
+    """
+    if stage == "convert_image":
+        return {**render_params(job, stage), "write_frame_jpeg": job["write_frame_jpeg"]}
+    if stage == "create_video":
+        params = {**render_params(job, stage), "stream_upload": job["stream_upload"]}
+        if job["video_engine"] == "parallel":
+            params["workers"] = job["video_workers"]
+        return params
+    if stage == "regenerate_subtitles":
+        return {"subtitle_engine": job["subtitle_engine"], "prompt_encoding": job["prompt_encoding"],
+                "llm_window_seconds": job["llm_window_seconds"]}
+    return None
+
+def stage_input_hashes(job, stage):
+    """
+    What the manifest records (and later compares) for a stage: its input files and params.
+    """
+    return hash_inputs(stage_inputs(job, stage), stage_params(job, stage))
+
+def caption_track_files(job):
+    """
+    Output SRT of each caption language; "en" is the regenerated English file the others are built from.
+    """
+    return {
+        code: os.path.join(job["output_dir"], f"{job['song_name']}_regenerated_{code}_captions.srt")
+        for code in job["caption_languages"]
+    }
+
+def stage_artifacts(job, stage):
+    """
+    Files a stage produces (the video upload's product is the video_id in the manifest).
+    """
+    return {
+        "convert_image": [job["output_image_file"]] if job["write_frame_jpeg"] else [],
+        "create_video": [] if job["stream_upload"] else [job["output_video_file"]],
+        "upload_video": [job["output_video_file"]] if job["stream_upload"] else [],
+        "download_captions": [job["downloaded_captions_file"]],
+        "regenerate_subtitles": list(dict.fromkeys([job["regenerated_captions_file_en"], *caption_track_files(job).values()])),
+        "upload_subtitles": [],
+    }[stage]
+
+def plan_song_stages(job, from_stage=None, only_stage=None):
+    """
+    Stages still to run for a song, according to its manifest and the overrides.
+    """
+    manifest = load_manifest(job["output_dir"], job["song_name"])
+    return plan_stages(manifest, STAGES, lambda stage: stage_inputs(job, stage), from_stage, only_stage,
+                       lambda stage: stage_artifacts(job, stage), lambda stage: stage_params(job, stage))
+
+def stage_quota_cost(stages, job=None):
+    """
+    Quota units the given stages will spend (with the job: one captions.insert per caption language).
+    """
+    from Utilities.quota_scheduler import calls_cost
+    tracks = len(job["caption_languages"]) if job else 1
+    return sum(calls_cost(STAGE_API_CALLS.get(stage, [])) * (tracks if stage == "upload_subtitles" else 1)
+               for stage in stages)
+
+def publish_priority(job):
+    """
+    The song's publishAtIST (ISO string, sorts chronologically), or None when unscheduled.
+    """
+    try:
+        with open(job["input_metadata_file"], "r", encoding="utf-8") as f:
+            return json.load(f).get("publishAtIST")
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def audio_seconds(job):
+    """
+    Length of the song's audio (schedules the caption polls), or None when it cannot be read.
+    """
+    from VideoGenerate.video_generate import probe_duration
+
+    try:
+        return probe_duration(job["input_audio_file"])
+    except (OSError, RuntimeError) as e:
+        print(f"⚠️ Could not read the audio length: {e}")
+        return None
+
+def ensure_youtube_state(job, state):
+    """
+    Loads credentials and metadata on first use, so resumed runs can start at any network stage.
+    """
+    from Utilities.get_credentials import get_default_credentials
+    from Utilities.youtube_metadata_utilities import extract_metadata
+
+    if not state.get("creds"):
+        state["creds"] = get_default_credentials()
+    if "metadata" not in state:
+        state["metadata"] = extract_metadata(metadata_file=job["input_metadata_file"], data_rel_dir=job["data_dir"])
+
+def require_video_id(state):
+    if not state.get("video_id"):
+        raise RuntimeError("No video_id in the manifest; run the upload_video stage first")
+    return state["video_id"]
+
+# -------------------------------
+# Stages
+# -------------------------------
+def get_frame(job, state):
+    """
+    The resized 1280x720 frame, decoded on first use and kept in memory for the encoder.
+    """
+    if state.get("frame") is None:
+        from ImageProcesser.image_resize import prepare_youtube_frame
+        state["frame"] = prepare_youtube_frame(job["input_image_file"], fit=job["image_fit"])
+    return state["frame"]
+
+def stage_convert_image(job, state):
+    print("Converting image for YouTube...")
+    os.makedirs(job["output_dir"], exist_ok=True)
+    if not job["write_frame_jpeg"]:
+        # The frame goes straight to the encoder; decoding is deferred so a cached video skips it
+        return
+
+    def render():
+        unlink_output(job["output_image_file"])
+        get_frame(job, state).save(job["output_image_file"], format="JPEG")
+        return os.path.exists(job["output_image_file"])
+
+    if job["use_cache"]:
+        ok = cached_render([job["input_image_file"]], render_params(job, "convert_image"), job["output_image_file"], render)
+    else:
+        ok = render()
+    if not ok:
+        raise RuntimeError(f"Image conversion failed for {job['input_image_file']}")
+
+def stage_create_video(job, state):
+    from VideoGenerate.video_generate import create_video
+
+    if job["stream_upload"]:
+        print("Streaming mode: the video is encoded during the upload stage")
+        return
+    print("Creating video from image and audio...")
+
+    def render():
+        unlink_output(job["output_video_file"])
+        return create_video(
+            image_path=get_frame(job, state), audio_path=job["input_audio_file"],
+            output_path=job["output_video_file"], extra_seconds=2, engine=job["video_engine"],
+            workers=job["video_workers"]
+        )
+
+    if job["use_cache"]:
+        stats = cached_render([job["input_image_file"], job["input_audio_file"]], render_params(job, "create_video"),
+                              job["output_video_file"], render)
+    else:
+        stats = render()
+    if not stats:
+        raise RuntimeError(f"Video creation failed for {job['song_name']}")
+
+def stage_upload_video(job, state):
+    # Network and encoder modules are imported inside the stages: CPU worker processes never
+    # load credentials, and `main.py --help` or a single-stage run only pays for what it uses.
+    from YouTubeUpload.youtube_upload import upload_video
+
+    print("Uploading video to YouTube...")
+    ensure_youtube_state(job, state)
+    if job["stream_upload"]:
+        response = stream_video_upload(job, state)
+    else:
+        response = upload_video(video_path=job["output_video_file"], metadata=state["metadata"], creds=state["creds"])
+    if not response or "id" not in response:
+        raise RuntimeError("Video upload failed")
+    state["video_id"] = response["id"]
+
+def stream_video_upload(job, state):
+    """
+    Encodes the fragmented MP4 straight into a resumable upload, teeing it to output/<song>/.
+    """
+    from google.auth.transport.requests import AuthorizedSession
+    from YouTubeUpload.youtube_upload import build_video_body
+    from YouTubeUpload.stream_upload import stream_encode_and_upload
+    from Utilities.quota_scheduler import record_api_call
+
+    record_api_call("videos.insert")
+    return stream_encode_and_upload(
+        get_frame(job, state), job["input_audio_file"], build_video_body(state["metadata"]),
+        AuthorizedSession(state["creds"]), extra_seconds=2, tee_path=job["output_video_file"]
+    )
+
+def stage_download_captions(job, state):
+    from SubtitleHandler.subtitle_autogen_downloader import get_autogen_subs
+
+    print("Downloading auto-generated subtitles...")
+    ensure_youtube_state(job, state)
+    get_autogen_subs(state["creds"], video_id=require_video_id(state), language="te",
+                     output_file=job["downloaded_captions_file"], metadata=state.get("metadata"),
+                     expected_seconds=audio_seconds(job))
+    if not os.path.exists(job["downloaded_captions_file"]):
+        raise RuntimeError(f"No auto-generated captions for video {state['video_id']}")
+
+def stage_regenerate_subtitles(job, state):
+    regenerate_english_subtitles(job)
+    build_language_tracks(job)
+
+def build_language_tracks(job):
+    """
+    Builds the other caption languages from the regenerated English file (translations run concurrently).
+    """
+    if job["caption_languages"] == ["en"]:
+        return
+    from SubtitleHandler.caption_fanout import build_caption_tracks
+
+    print(f"Building caption tracks: {', '.join(job['caption_languages'])}...")
+    results = build_caption_tracks(job["regenerated_captions_file_en"], caption_track_files(job),
+                                   use_cache=job["use_llm_cache"], usage_log=job["llm_usage_log"], label=job["song_name"])
+    failed = [code for code, result in results.items() if result["status"] != "ok"]
+    if failed:
+        raise RuntimeError(f"Caption tracks failed: {', '.join(failed)}")
+
+def regenerate_english_subtitles(job):
+    if job["subtitle_engine"] == "align":
+        from SubtitleHandler.lyric_aligner import align_subtitles
+
+        print("Aligning lyrics to the auto-generated captions...")
+        report = align_subtitles(job["downloaded_captions_file"], job["input_lyrics_file"], job["regenerated_captions_file_en"])
+        if report["ok"]:
+            return
+        print("Falling back to the Gemini model for this song")
+
+    if job["llm_window_seconds"]:
+        from SubtitleHandler.windowed_generation import generate_subtitles_windowed
+
+        print("Regenerating subtitles using Gemini model, window by window...")
+        generate_subtitles_windowed(
+            model_name="gemini-2.5-flash",
+            srt_file=job["downloaded_captions_file"],
+            lyrics_file=job["input_lyrics_file"],
+            prompt_file=job["input_prompt_file"],
+            output_file=job["regenerated_captions_file_en"],
+            window_seconds=job["llm_window_seconds"],
+            use_cache=job["use_llm_cache"],
+            prompt_encoding=job["prompt_encoding"],
+            usage_log=job["llm_usage_log"],
+            label=job["song_name"]
+        )
+        return
+
+    from SubtitleHandler.subtitle_generator import generate_subtitles_with_model
+
+    print("Regenerating subtitles using Gemini model...")
+    generate_subtitles_with_model(
+        model_name="gemini-2.5-flash",
+        srt_file=job["downloaded_captions_file"],
+        lyrics_file=job["input_lyrics_file"],
+        prompt_file=job["input_prompt_file"],
+        output_file=job["regenerated_captions_file_en"],
+        use_cache=job["use_llm_cache"],
+        stream=job["stream_llm"],
+        prompt_encoding=job["prompt_encoding"],
+        usage_log=job["llm_usage_log"],
+        label=job["song_name"]
+    )
+
+def stage_upload_subtitles(job, state):
+    from SubtitleHandler.caption_fanout import upload_caption_tracks
+
+    print("Uploading regenerated subtitles to YouTube...")
+    ensure_youtube_state(job, state)
+    results = upload_caption_tracks(require_video_id(state), caption_track_files(job), creds=state["creds"])
+    failed = [code for code, result in results.items() if result["status"] != "ok"]
+    if failed:
+        raise RuntimeError(f"Caption uploads failed: {', '.join(failed)}")
+
+STAGE_FUNCTIONS = {
+    "convert_image": stage_convert_image,
+    "create_video": stage_create_video,
+    "upload_video": stage_upload_video,
+    "download_captions": stage_download_captions,
+    "regenerate_subtitles": stage_regenerate_subtitles,
+    "upload_subtitles": stage_upload_subtitles,
+}
+
+def run_stages(job, stages, state=None):
+    """
+    Runs the given stages in order for one song.
+    - Records every stage (status, input and option hashes, artifacts) in the song's manifest
+    - Picks up the video_id of an earlier run from the manifest
+    - Stops at the first failing stage
+    - Returns (state, timings, error) where timings maps stage -> seconds
+    """
+    state = state if state is not None else {}
+    manifest = load_manifest(job["output_dir"], job["song_name"])
+    state.setdefault("video_id", manifest.get("video_id"))
+    timings = {}
+    for stage in stages:
+        input_hashes = stage_input_hashes(job, stage)
+        start = time.perf_counter()
+        try:
+            STAGE_FUNCTIONS[stage](job, state)
+        except Exception as e:
+            timings[stage] = time.perf_counter() - start
+            record_stage(manifest, stage, "failed", input_hashes, [], error=str(e))
+            save_manifest(job["output_dir"], manifest)
+            return state, timings, f"{stage}: {e}"
+        timings[stage] = time.perf_counter() - start
+        record_stage(manifest, stage, "done", input_hashes, stage_artifacts(job, stage))
+        manifest["video_id"] = state.get("video_id")
+        save_manifest(job["output_dir"], manifest)
+    return state, timings, None
@@ -0,0 +1,128 @@
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from Pipeline.song_job import CPU_STAGES, build_song_job, plan_song_stages, run_stages
+from Pipeline.batch_runner import run_cpu_stages, default_worker_count, print_summary, schedule_by_quota
+
+# Pipeline groups in order: (group name, stages it runs, default worker threads).
+# encode is CPU-bound and is handed to a process pool; the others wait on the network.
+PIPELINE_GROUPS = [
+    ("encode", CPU_STAGES, default_worker_count()),
+    ("upload", ["upload_video"], 2),
+    ("caption_wait", ["download_captions"], 8),
+    ("llm", ["regenerate_subtitles"], 4),
+    ("caption_upload", ["upload_subtitles"], 4),
+]
+
+_DONE = object()
+
+# -------------------------------
+# Pipeline
+# -------------------------------
+class StagedPipeline:
+    """
+    Producer/consumer pipeline that lets songs flow through the stages concurrently.
+    - Every group has its own worker threads and a bounded input queue, so a slow
+      group applies back-pressure instead of piling up finished encodes
+    - Song N+1 encodes while song N uploads or waits for captions
+    - A failing song drops out of the pipeline without affecting the others
+    """
+
+    def __init__(self, workers=None, queue_size=2, options=None):
+        self.options = options or {}
+        self.workers = {name: count for name, _, count in PIPELINE_GROUPS}
+        self.workers.update(workers or {})
+        self.queue_size = queue_size
+        self.queues = {name: queue.Queue(maxsize=queue_size) for name, _, _ in PIPELINE_GROUPS}
+        self.results = {}
+        self.busy_seconds = {name: 0.0 for name, _, _ in PIPELINE_GROUPS}
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def _next_group(self, group_name):
+        names = [name for name, _, _ in PIPELINE_GROUPS]
+        index = names.index(group_name) + 1
+        return names[index] if index < len(names) else None
+
+    def _run_group(self, group_name, group_stages, item):
+        stages = [stage for stage in item["plan"] if stage in group_stages]
+        if not stages:
+            return None
+        if group_name == "encode":
+            timings, error = self.pool.submit(run_cpu_stages, item["job"], stages).result()
+        else:
+            _, timings, error = run_stages(item["job"], stages, state=item["state"])
+        with self.lock:
+            self.results[item["name"]]["timings"].update(timings)
+            self.busy_seconds[group_name] += sum(timings.values())
+        return error
+
+    def _worker(self, group_name, group_stages):
+        inbox = self.queues[group_name]
+        next_group = self._next_group(group_name)
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            try:
+                error = self._run_group(group_name, group_stages, item)
+            except Exception as e:
+                error = f"{group_name}: {e}"
+            if error:
+                with self.lock:
+                    self.results[item["name"]].update(status="failed", error=error)
+                print(f"❌ {item['name']}: {error}")
+                continue
+            if next_group:
+                # Blocks while the next group is saturated (back-pressure)
+                self.queues[next_group].put(item)
+
+    def run(self, song_names):
+        """
+        Pushes every song through the pipeline and returns per-song result dicts.
+        """
+        start = time.perf_counter()
+        jobs = {name: build_song_job(name, self.options) for name in song_names}
+        plans = {}
+        for name, job in jobs.items():
+            plans[name] = plan_song_stages(job, self.options.get("from_stage"), self.options.get("only_stage"))
+            self.results[name] = {"song_name": name, "status": "ok" if plans[name] else "done", "error": None, "timings": {}}
+        # Songs enter the pipeline in publish order; ones that do not fit today's quota wait
+        if self.options.get("ignore_quota"):
+            feed_order = [name for name in song_names if plans[name]]
+        else:
+            feed_order = schedule_by_quota(jobs, plans, self.results)
+
+        threads = {}
+        with ProcessPoolExecutor(max_workers=self.workers["encode"]) as pool:
+            self.pool = pool
+            for group_name, group_stages, _ in PIPELINE_GROUPS:
+                threads[group_name] = [
+                    threading.Thread(target=self._worker, args=(group_name, group_stages), daemon=True)
+                    for _ in range(self.workers[group_name])
+                ]
+                for thread in threads[group_name]:
+                    thread.start()
+
+            first_group = PIPELINE_GROUPS[0][0]
+            for name in feed_order:
+                self.queues[first_group].put({"name": name, "job": jobs[name], "plan": plans[name], "state": {}})
+
+            # Drain the groups in order: once a group's workers exit, nothing more can reach the next one
+            for group_name, _, _ in PIPELINE_GROUPS:
+                for _ in threads[group_name]:
+                    self.queues[group_name].put(_DONE)
+                for thread in threads[group_name]:
+                    thread.join()
+
+        wall_seconds = time.perf_counter() - start
+        summary = [self.results[name] for name in song_names]
+        print_summary(summary)
+        print(f"\n⏱️ Wall time {wall_seconds:.1f}s; busy time per group: "
+              + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.busy_seconds.items()))
+        return summary
+
+def run_pipelined_batch(song_names, options=None, workers=None):
+    return StagedPipeline(workers=workers, options=options).run(song_names)
@@ -0,0 +1,171 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from SubtitleHandler.subtitle_track import SubtitleTrack
+from Utilities.llm_cache import cached_generate
+from Utilities.llm_usage import measure_call, record_call
+
+DEFAULT_MAX_CONCURRENCY = 4
+# Caption tracks we know how to build. "iast" and "en" come straight from the regenerated
+# English file (IAST line + English meaning); every other code is a translated meaning.
+TRACK_NAMES = {
+    "iast": "Telugu (IAST)",
+    "en": "English Subtitles",
+    "hi": "Hindi",
+    "ta": "Tamil",
+    "kn": "Kannada",
+    "ml": "Malayalam",
+    "mr": "Marathi",
+    "bn": "Bengali",
+    "gu": "Gujarati",
+}
+# YouTube language of each track (the IAST track is Telugu written in Latin script).
+TRACK_LANGUAGES = {"iast": "te"}
+TRANSLATION_LINE_RE = re.compile(r"^\s*(\d+)\s*[.:)|-]\s*(.*\S)\s*$")
+
+def track_language(code):
+    return TRACK_LANGUAGES.get(code, code)
+
+def track_name(code):
+    return TRACK_NAMES.get(code, code)
+
+# -------------------------------
+# Translation
+# -------------------------------
+def split_cue(text):
+    """
+    (iast, meaning) of a regenerated cue; meaning is "" when the cue has a single line.
+    """
+    lines = text.split("\n")
+    return lines[0], " ".join(lines[1:])
+
+def build_translation_prompt(lines, language_name):
+    numbered = "\n".join(f"{index}. {line}" for index, line in enumerate(lines, start=1))
+    return f"""
+Translate each numbered line of these devotional song subtitles from English into {language_name}.
+- Keep the numbering: one output line per input line, "<number>. <translation>".
+- Translate the meaning naturally; do not add notes, quotes or any other text.
+
+{numbered}
+    """
+
+def parse_translation(text, count):
+    """
+    {number: translation} from the model output; raises when a line is missing.
+    """
+    translations = {}
+    for line in text.splitlines():
+        match = TRANSLATION_LINE_RE.match(line)
+        if match and 1 <= int(match.group(1)) <= count:
+            translations[int(match.group(1))] = match.group(2)
+    missing = [number for number in range(1, count + 1) if number not in translations]
+    if missing:
+        raise RuntimeError(f"Translation is missing {len(missing)} of {count} lines")
+    return translations
+
+def translate_track(source_track, code, model_name, generate_fn, use_cache=True, usage_log=None, label=None):
+    """
+    The source timeline with each meaning translated; the IAST line is kept.
+    - Only distinct meanings are sent (choruses repeat), numbered, in one call through the LLM cache
+    - Timings never go through the model, so every track shares the source timeline exactly
+    """
+    cues = [split_cue(text) for text in source_track.texts]
+    lines = list(dict.fromkeys(meaning for _, meaning in cues if meaning))
+    translated = {}
+    if lines:
+        prompt = build_translation_prompt(lines, track_name(code))
+        stats = {}
+
+        def measured_generate(model, prompt):
+            text, call_stats = measure_call(generate_fn, model, prompt)
+            stats.update(call_stats)
+            return text
+
+        raw_output, cache_hit = cached_generate(model_name, prompt, measured_generate, use_cache=use_cache,
+                                                validate=lambda text: parse_translation(text, len(lines)))
+        record_call(usage_log, label, model_name, f"translate-{code}", prompt, stats, cache_hit)
+        numbered = parse_translation(raw_output, len(lines))
+        translated = {line: numbered[number] for number, line in enumerate(lines, start=1)}
+    texts = ["\n".join(filter(None, [iast, translated.get(meaning, "")])) for iast, meaning in cues]
+    return SubtitleTrack(source_track.starts, source_track.ends, texts)
+
+# -------------------------------
+# Fan-out
+# -------------------------------
+def build_track(source_track, code, model_name, generate_fn, use_cache, usage_log, label):
+    if code == "en":
+        return source_track
+    if code == "iast":
+        return SubtitleTrack(source_track.starts, source_track.ends, [split_cue(text)[0] for text in source_track.texts])
+    return translate_track(source_track, code, model_name, generate_fn, use_cache, usage_log, label)
+
+def build_caption_tracks(source_srt, track_files, model_name="gemini-2.5-flash", generate_fn=None, use_cache=True,
+                         max_concurrency=DEFAULT_MAX_CONCURRENCY, usage_log=None, label=None):
+    """
+    Writes one SRT per language from the regenerated English file (one aligned cue timeline).
+    - track_files maps a track code ("iast", "en", "hi", ...) to its output path
+    - Translations run concurrently; a failing language does not stop the others
+    - Returns {code: {"file", "status", "cues", "seconds", "error"}}
+    """
+    if generate_fn is None:
+        from SubtitleHandler.subtitle_generator import call_gemini
+        generate_fn = call_gemini
+    source_track = SubtitleTrack.read(source_srt)
+
+    def run(item):
+        code, output_file = item
+        started_at = time.perf_counter()
+        result = {"file": output_file, "status": "ok", "cues": 0, "seconds": 0.0, "error": None}
+        try:
+            track = build_track(source_track, code, model_name, generate_fn, use_cache, usage_log,
+                                f"{label}:{code}" if label else code).drop_empty()
+            if code != "en":
+                track.write(output_file)
+            result["cues"] = len(track)
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+        result["seconds"] = round(time.perf_counter() - started_at, 2)
+        return code, result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(track_files)))) as pool:
+        results = dict(pool.map(run, track_files.items()))
+    print_track_status("Caption tracks", results)
+    return results
+
+def upload_caption_tracks(video_id, track_files, creds=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, upload_fn=None):
+    """
+    Uploads every caption track in parallel (one captions.insert each).
+    - upload_fn(video_id, srt_file, language, name, creds) -> response or None; default upload_subtitles
+    - Returns {code: {"file", "status", "caption_id", "seconds", "error"}}
+    """
+    if upload_fn is None:
+        from Utilities.youtube_set_get import upload_subtitles
+        upload_fn = upload_subtitles
+
+    def run(item):
+        code, srt_file = item
+        started_at = time.perf_counter()
+        result = {"file": srt_file, "status": "ok", "caption_id": None, "seconds": 0.0, "error": None}
+        try:
+            response = upload_fn(video_id=video_id, srt_file=srt_file, language=track_language(code),
+                                 name=track_name(code), creds=creds)
+            if not response or "id" not in response:
+                raise RuntimeError("captions.insert returned no caption id")
+            result["caption_id"] = response["id"]
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+        result["seconds"] = round(time.perf_counter() - started_at, 2)
+        return code, result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(track_files)))) as pool:
+        results = dict(pool.map(run, track_files.items()))
+    print_track_status("Caption uploads", results)
+    return results
+
+def print_track_status(title, results):
+    print(f"{title}:")
+    for code, result in results.items():
+        icon = "✅" if result["status"] == "ok" else "❌"
+        detail = result["error"] or result.get("caption_id") or f"{result.get('cues', 0)} cues"
+        print(f"  {icon} {code:<5} {track_name(code):<18} {result['seconds']:>6.2f}s  {detail}")
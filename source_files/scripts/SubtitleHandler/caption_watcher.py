@@ -0,0 +1,240 @@
+import time
+import random
+import asyncio
+import inspect
+import threading
+
+# youtube-transcript-api errors that will not go away by waiting. Matched by class name,
+# so fake transcript sources in tests can raise look-alike exceptions.
+PERMANENT_ERRORS = {"InvalidVideoId", "AgeRestricted"}
+# ASR has not produced the track yet: keep polling on the normal schedule.
+PENDING_ERRORS = {"NoTranscriptFound"}
+# Also what a fresh upload looks like: no captionTracks yet (TranscriptsDisabled) or still
+# processing (VideoUnplayable/VideoUnavailable). Pending until the grace period runs out, then permanent.
+PROVISIONAL_ERRORS = {"TranscriptsDisabled", "VideoUnplayable", "VideoUnavailable"}
+# Anything else (network errors, rate limiting, ...) is transient and retried up to MAX_TRANSIENT_ERRORS times in a row.
+
+DEFAULT_MIN_INTERVAL = 15
+DEFAULT_MAX_INTERVAL = 300
+DEFAULT_BACKOFF = 1.6
+MAX_TRANSIENT_ERRORS = 8
+# Grace period for PROVISIONAL_ERRORS: at least this long, or ASR_TIME_FACTOR x the track length.
+DEFAULT_GRACE_SECONDS = 300
+ASR_TIME_FACTOR = 2
+
+class PermanentTranscriptError(Exception):
+    """
+    The transcript will never become available (e.g. captions disabled on the video).
+    """
+
+def classify_error(error, in_grace_period=False):
+    """
+    Returns "permanent", "pending" or "transient" for an exception raised by a transcript source.
+    - PROVISIONAL_ERRORS are "pending" while in_grace_period, "permanent" afterwards
+    """
+    name = type(error).__name__
+    if name in PERMANENT_ERRORS:
+        return "permanent"
+    if name in PROVISIONAL_ERRORS:
+        return "pending" if in_grace_period else "permanent"
+    if name in PENDING_ERRORS:
+        return "pending"
+    return "transient"
+
+def default_transcript_source(video_id, language):
+    """
+    Fetches the auto-generated transcript with youtube-transcript-api (raises while it is not ready).
+    """
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    transcripts = YouTubeTranscriptApi().list(video_id=video_id)
+    return transcripts.find_generated_transcript([language]).fetch()
+
+# -------------------------------
+# Watcher
+# -------------------------------
+class CaptionWatcher:
+    """
+    Waits for the auto-generated transcripts of many videos at once on one event loop.
+    - Each video polls on its own jittered, growing interval, so far-off ASR is polled rarely
+    - The first poll can be pushed out with expected_seconds (e.g. the track length)
+    - Permanent errors end the wait at once; transient ones are retried with backoff
+    - "Captions disabled"/"video unplayable" count as pending for a grace period after upload
+      (grace_seconds, or ASR_TIME_FACTOR x expected_seconds when longer)
+    - watch() returns a future per video and optionally calls callback(video_id, transcript, error)
+    """
+
+    def __init__(self, source=default_transcript_source, language="te", max_wait=600,
+                 min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 backoff=DEFAULT_BACKOFF, max_concurrency=8, grace_seconds=DEFAULT_GRACE_SECONDS):
+        self.source = source
+        self.grace_seconds = grace_seconds
+        self.language = language
+        self.max_wait = max_wait
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.semaphore = None
+        self.max_concurrency = max_concurrency
+        self.tasks = []
+        self.futures = {}
+
+    def next_interval(self, attempt):
+        """
+        Exponential interval with jitter in [50%, 100%], so many videos don't poll in lockstep.
+        """
+        interval = min(self.max_interval, self.min_interval * self.backoff ** attempt)
+        return random.uniform(interval / 2, interval)
+
+    def grace_period(self, expected_seconds):
+        """
+        How long provisional errors are waited out for a video.
+        """
+        return max(self.grace_seconds, ASR_TIME_FACTOR * (expected_seconds or 0))
+
+    async def fetch(self, video_id):
+        async with self.semaphore:
+            if inspect.iscoroutinefunction(self.source):
+                return await self.source(video_id, self.language)
+            # youtube-transcript-api is blocking; keep it off the event loop
+            return await asyncio.to_thread(self.source, video_id, self.language)
+
+    async def _poll(self, video_id, future, callback, expected_seconds):
+        started_at = time.monotonic()
+        deadline = started_at + self.max_wait
+        grace_deadline = started_at + self.grace_period(expected_seconds)
+        attempt, transient_errors = 0, 0
+        transcript, error = None, None
+
+        if expected_seconds:
+            # ASR rarely finishes much before the track length; the first look can wait
+            await asyncio.sleep(min(expected_seconds / 2, self.max_interval, self.max_wait))
+
+        while True:
+            try:
+                transcript = await self.fetch(video_id)
+                print(f"✅ Transcript for {video_id} after {time.monotonic() - started_at:.0f}s")
+                break
+            except Exception as e:
+                kind = classify_error(e, in_grace_period=time.monotonic() < grace_deadline)
+                if kind == "permanent":
+                    error = PermanentTranscriptError(f"{type(e).__name__}: {e}")
+                    print(f"❌ {video_id}: {error}")
+                    break
+                if kind == "transient":
+                    transient_errors += 1
+                    if transient_errors > MAX_TRANSIENT_ERRORS:
+                        error = RuntimeError(f"{video_id}: giving up after {transient_errors} errors ({type(e).__name__}: {e})")
+                        break
+                else:
+                    transient_errors = 0
+
+            delay = self.next_interval(attempt)
+            attempt += 1
+            if time.monotonic() + delay > deadline:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    error = TimeoutError(f"No transcript for {video_id} after {self.max_wait}s")
+                    print(f"⏱️ {error}")
+                    break
+                # One last look right at the deadline
+                delay = remaining
+            print(f"No transcript yet for {video_id} ({kind}), next check in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+        if not future.done():
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(transcript)
+        if callback:
+            callback(video_id, transcript, error)
+
+    def watch(self, video_id, callback=None, expected_seconds=None, keep_result=True):
+        """
+        Starts watching video_id on the running loop and returns its future.
+        - keep_result=False drops the video's task and future once its poll ends (wait_all() will not
+          report it), so a long-lived watcher does not keep every finished video alive
+        """
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        future = asyncio.get_running_loop().create_future()
+        self.futures[video_id] = future
+        task = asyncio.create_task(self._poll(video_id, future, callback, expected_seconds))
+        self.tasks.append(task)
+        if not keep_result:
+            task.add_done_callback(lambda task: self._forget(video_id, future, task))
+        return future
+
+    def _forget(self, video_id, future, task):
+        self.tasks.remove(task)
+        # The same video may have been watched again meanwhile; only drop this watch's future
+        if self.futures.get(video_id) is future:
+            del self.futures[video_id]
+
+    async def wait_all(self):
+        """
+        Waits for every watched video; returns {video_id: (transcript or None, error or None)}.
+        """
+        await asyncio.gather(*self.tasks)
+        return {video_id: (None, future.exception()) if future.exception() else (future.result(), None)
+                for video_id, future in self.futures.items()}
+
+# -------------------------------
+# Shared watcher
+# -------------------------------
+class SharedCaptionWatcher:
+    """
+    One event loop on a background thread that every caller hands its video to, so the
+    pipeline's caption_wait threads all wait on a single watcher instead of a loop each.
+    - wait() blocks the calling thread only; polling for all videos happens on the shared loop
+    - Videos watched with the same options share one CaptionWatcher (and its concurrency limit)
+    - Finished videos are dropped from their watcher, so a long --all run does not accumulate them
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.watchers = {}
+        self.lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="caption-watcher", daemon=True).start()
+        return self.loop
+
+    def wait(self, video_id, expected_seconds=None, **watcher_options):
+        """
+        Watches video_id on the shared loop; returns (transcript or None, error or None).
+        """
+        key = tuple(sorted(watcher_options.items()))
+
+        async def watch():
+            if key not in self.watchers:
+                self.watchers[key] = CaptionWatcher(**watcher_options)
+            try:
+                return await self.watchers[key].watch(video_id, expected_seconds=expected_seconds, keep_result=False), None
+            except Exception as e:
+                return None, e
+
+        return asyncio.run_coroutine_threadsafe(watch(), self._ensure_loop()).result()
+
+shared_watcher = SharedCaptionWatcher()
+
+# -------------------------------
+# Blocking helpers
+# -------------------------------
+def wait_for_transcripts(video_ids, callback=None, expected_seconds=None, **watcher_options):
+    """
+    Watches many videos from synchronous code.
+    - expected_seconds: optional {video_id: seconds} hint for the first poll
+    - Returns {video_id: (transcript or None, error or None)}
+    """
+    async def run():
+        watcher = CaptionWatcher(**watcher_options)
+        for video_id in video_ids:
+            watcher.watch(video_id, callback=callback, expected_seconds=(expected_seconds or {}).get(video_id))
+        return await watcher.wait_all()
+
+    return asyncio.run(run())
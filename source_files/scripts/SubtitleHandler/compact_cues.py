@@ -0,0 +1,142 @@
+import re
+import sys
+import argparse
+
+from SubtitleHandler.subtitle_track import SubtitleTrack, FILLER_RE
+
+# "<time> <duration> <text>" in centiseconds. In the captions we send, time is the gap from the previous
+# cue's start (short numbers); in the model's answer it is the absolute start, so one wrong number
+# cannot shift every later cue.
+CUE_LINE_RE = re.compile(r"^\+?(\d+)\s+(\d+)\s+(.*\S)$")
+# Lines of a cue (IAST, English meaning) are joined with this on a single line.
+LINE_SEPARATOR = " | "
+
+FORMAT_DESCRIPTION = f"""Compact cue format (input captions), one cue per line: <gap> <duration> <text>
+- gap: centiseconds since the start of the previous cue; duration: centiseconds on screen
+- the lines of a cue are joined with "{LINE_SEPARATOR.strip()}\""""
+
+OUTPUT_FORMAT_DESCRIPTION = f"""Compact cue output format, one cue per line: <start> <duration> <text>
+- start: absolute centiseconds from 0:00 (not a gap); duration: centiseconds on screen
+- join the lines of a cue with "{LINE_SEPARATOR.strip()}"; cues in order of start
+Example: "3504 772 ēmi kāvālō nākeruka lēdē svāmi {LINE_SEPARATOR.strip()} I don't know what I want, O Lord.\""""
+
+# -------------------------------
+# Encoding
+# -------------------------------
+def compact_track(track):
+    """
+    Strips what the model does not need before encoding.
+    - Inline filler such as [సంగీతం] is removed and cues left empty are dropped
+    - A cue repeating the previous cue's text while they overlap is merged into it
+    """
+    compacted = SubtitleTrack()
+    for start, end, text in track.sorted():
+        lines = (" ".join(FILLER_RE.sub(" ", line).split()) for line in text.splitlines())
+        text = "\n".join(line for line in lines if line)
+        if not text or end <= start:
+            continue
+        if len(compacted) and compacted.texts[-1] == text and start <= compacted.ends[-1]:
+            compacted.ends[-1] = max(compacted.ends[-1], end)
+            continue
+        compacted.append(start, end, text)
+    return compacted
+
+def encode_cues(track, relative=True):
+    """
+    Encodes a track as compact cue lines.
+    - relative=True: gaps from the previous start (FORMAT_DESCRIPTION, the captions we send)
+    - relative=False: absolute starts (OUTPUT_FORMAT_DESCRIPTION, what the model answers)
+    - Times are rounded to centiseconds; gaps are taken between rounded starts so errors do not add up
+    """
+    lines = []
+    previous_start = 0
+    for start, end, text in compact_track(track):
+        start_cs, end_cs = round(start / 10), round(end / 10)
+        time_cs = start_cs - previous_start if relative else start_cs
+        lines.append(f"{time_cs} {max(1, end_cs - start_cs)} {LINE_SEPARATOR.join(text.splitlines())}")
+        previous_start = start_cs
+    return "\n".join(lines) + "\n"
+
+# -------------------------------
+# Decoding
+# -------------------------------
+class CompactCueParser:
+    """
+    Incremental decoder for compact cue lines; same interface as SrtStreamParser
+    (feed/close return finished (start_ms, end_ms, text) cues, rejected_blocks counts bad lines).
+    - relative=False (model output) reads absolute starts; a start before the previous one is rejected
+    - Code fences and blank lines are ignored
+    """
+
+    def __init__(self, drop_filler=False, relative=False):
+        self.drop_filler = drop_filler
+        self.relative = relative
+        self.partial_line = ""
+        self.previous_start = 0
+        self.rejected_blocks = 0
+
+    def push_line(self, line):
+        line = line.strip()
+        if not line or line.startswith("```"):
+            return None
+        match = CUE_LINE_RE.match(line)
+        if not match:
+            self.rejected_blocks += 1
+            return None
+        time_cs, duration, text = match.groups()
+        start = self.previous_start + int(time_cs) if self.relative else int(time_cs)
+        if start < self.previous_start:
+            self.rejected_blocks += 1
+            return None
+        self.previous_start = start
+        text_lines = [part.strip() for part in text.split(LINE_SEPARATOR.strip())]
+        if self.drop_filler:
+            text_lines = [part for part in text_lines if not FILLER_RE.match(part)]
+        text_lines = [part for part in text_lines if part]
+        if not text_lines:
+            return None
+        return start * 10, (start + int(duration)) * 10, "\n".join(text_lines)
+
+    def feed(self, text):
+        lines = (self.partial_line + text).split("\n")
+        self.partial_line = lines.pop()
+        return [cue for cue in map(self.push_line, lines) if cue]
+
+    def close(self):
+        cue = self.push_line(self.partial_line)
+        self.partial_line = ""
+        return [cue] if cue else []
+
+def decode_cues(text, drop_filler=False, relative=False):
+    """
+    Compact cue lines -> SubtitleTrack (write it out with .write() / .to_text() for SRT).
+    - relative=True for captions made by encode_cues(); model output has absolute starts
+    """
+    parser = CompactCueParser(drop_filler=drop_filler, relative=relative)
+    track = SubtitleTrack()
+    for cue in parser.feed(text) + parser.close():
+        track.append(*cue)
+    return track
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Show how much smaller the compact cue encoding of an SRT file is.")
+    parser.add_argument("srt_file", help="Captions to encode.")
+    parser.add_argument("--show", action="store_true", help="Print the compact encoding.")
+    args = parser.parse_args()
+
+    with open(args.srt_file, "r", encoding="utf-8") as f:
+        srt_text = f.read()
+    track = SubtitleTrack.from_text(srt_text, drop_filler=True)
+    compact_text = encode_cues(track)
+    if args.show:
+        print(compact_text)
+    print(f"SRT:     {len(srt_text):>7} chars, {len(track)} cues")
+    print(f"Compact: {len(compact_text):>7} chars, {len(decode_cues(compact_text, relative=True))} cues "
+          f"({100 * (1 - len(compact_text) / max(1, len(srt_text))):.0f}% smaller)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import sys
+import json
+import time
+import argparse
+from difflib import SequenceMatcher
+
+from SubtitleHandler.subtitle_track import SubtitleTrack, FILLER_RE
+from SubtitleHandler.telugu_iast import contains_telugu, to_iast, phonetic_key
+
+# A cue whose ASR words match its lyric line less than this is sent to the LLM fallback.
+DEFAULT_MIN_CONFIDENCE = 0.6
+# A stretch of ASR words is only compared with a lyric line of roughly the same length.
+MIN_LENGTH_RATIO = 0.5
+MAX_LENGTH_RATIO = 1.6
+
+# -------------------------------
+# Inputs
+# -------------------------------
+def parse_lyrics(lyrics_file):
+    """
+    Reads lyrics.txt into (telugu_line, english_meaning) pairs.
+    - A Telugu line is followed by its meaning; blank lines between stanzas are ignored
+    - Lines repeated in the song are listed once; the aligner finds every repetition
+    """
+    pairs = []
+    with open(lyrics_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = " ".join(line.split())
+            if not line:
+                continue
+            if contains_telugu(line):
+                pairs.append([line, ""])
+            elif pairs and not pairs[-1][1]:
+                pairs[-1][1] = line
+    return [tuple(pair) for pair in pairs]
+
+def asr_words(asr_track):
+    """
+    Splits the ASR cues into words with estimated times.
+    - Rolling YouTube captions overlap, so each cue is first cut where the next one starts
+    - A cue's time span is shared among its words in proportion to their length
+    - Returns a list of (start_ms, end_ms, word)
+    """
+    words = []
+    for start, end, text in asr_track.resolve_overlaps():
+        tokens = [token for token in text.split() if not FILLER_RE.match(token)]
+        total_chars = sum(len(token) for token in tokens)
+        position = start
+        for token in tokens:
+            token_end = position + (end - start) * len(token) / total_chars
+            words.append((round(position), round(token_end), token))
+            position = token_end
+    return words
+
+# -------------------------------
+# Alignment
+# -------------------------------
+def align_lyrics(asr_track, lyric_pairs):
+    """
+    Maps lyric lines onto the ASR timeline with dynamic programming.
+    - The ASR word sequence is split into consecutive stretches; each stretch is either
+      skipped (noise, instrumental) or labelled with the lyric line it sounds most like
+    - Similarity compares loose phonetic keys (see telugu_iast.phonetic_key), so spelling,
+      spacing and aspiration differences between ASR and lyrics do not matter
+    - A stretch scores (similarity - 0.5) * line length, so full matches beat fragments
+      and weak matches are better skipped; lines may repeat (choruses)
+    - Returns a list of cue dicts: start_ms, end_ms, line (index into lyric_pairs), confidence
+    """
+    words = asr_words(asr_track)
+    word_keys = [phonetic_key(word) for _, _, word in words]
+    line_keys = [phonetic_key(telugu) for telugu, _ in lyric_pairs]
+    max_line_chars = max((len(key) for key in line_keys), default=0)
+
+    n = len(words)
+    best = [0.0] * (n + 1)
+    back = [None] * (n + 1)
+    for end in range(1, n + 1):
+        # Skipping word end-1 costs nothing
+        best[end], back[end] = best[end - 1], (end - 1, None, 0.0)
+        chunk_key = ""
+        for start in range(end - 1, -1, -1):
+            chunk_key = word_keys[start] + chunk_key
+            if len(chunk_key) > max_line_chars * MAX_LENGTH_RATIO:
+                break
+            for line, line_key in enumerate(line_keys):
+                if not line_key or not MIN_LENGTH_RATIO <= len(chunk_key) / len(line_key) <= MAX_LENGTH_RATIO:
+                    continue
+                similarity = SequenceMatcher(None, chunk_key, line_key, autojunk=False).ratio()
+                score = best[start] + (similarity - 0.5) * len(line_key)
+                if score > best[end]:
+                    best[end], back[end] = score, (start, line, similarity)
+
+    cues = []
+    end = n
+    while end > 0:
+        start, line, similarity = back[end]
+        if line is not None:
+            cues.append({"start_ms": words[start][0], "end_ms": words[end - 1][1], "line": line,
+                         "confidence": round(similarity, 3)})
+        end = start
+    cues.reverse()
+    return cues
+
+def build_subtitle_track(cues, lyric_pairs):
+    """
+    Final subtitle track: IAST transcription and English meaning per cue.
+    """
+    track = SubtitleTrack()
+    for cue in cues:
+        telugu, english = lyric_pairs[cue["line"]]
+        track.append(cue["start_ms"], cue["end_ms"], "\n".join(filter(None, [to_iast(telugu), english])))
+    return track
+
+def alignment_report(cues, lyric_pairs, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    Summarizes an alignment; `ok` is False when a cue is below min_confidence or a lyric line was never found.
+    """
+    matched_lines = {cue["line"] for cue in cues}
+    low_confidence = [index for index, cue in enumerate(cues) if cue["confidence"] < min_confidence]
+    missing_lines = [index for index in range(len(lyric_pairs)) if index not in matched_lines]
+    return {
+        "ok": bool(cues) and not low_confidence and not missing_lines,
+        "cues": len(cues),
+        "mean_confidence": round(sum(cue["confidence"] for cue in cues) / len(cues), 3) if cues else 0.0,
+        "low_confidence_cues": low_confidence,
+        "missing_lines": missing_lines,
+    }
+
+def print_alignment(cues, lyric_pairs, report):
+    print(f"{'#':>3}  {'start':>9}  {'end':>9}  {'conf':>5}  lyric")
+    for index, cue in enumerate(cues, start=1):
+        flag = " ⚠️" if index - 1 in report["low_confidence_cues"] else ""
+        print(f"{index:>3}  {cue['start_ms'] / 1000:>9.2f}  {cue['end_ms'] / 1000:>9.2f}  {cue['confidence']:>5.2f}  "
+              f"{to_iast(lyric_pairs[cue['line']][0])}{flag}")
+    for line in report["missing_lines"]:
+        print(f"⚠️ Lyric line {line + 1} was not found in the captions: {lyric_pairs[line][0]}")
+
+# -------------------------------
+# File-level entry point
+# -------------------------------
+def align_subtitles(srt_file, lyrics_file, output_file, min_confidence=DEFAULT_MIN_CONFIDENCE, write_low_confidence=False):
+    """
+    Aligns lyrics.txt to the downloaded ASR captions and writes the final SRT.
+    - Writes output_file only when the alignment is confident (or write_low_confidence is set)
+    - Returns the alignment report (with per-cue confidences and timing)
+    """
+    started_at = time.perf_counter()
+    lyric_pairs = parse_lyrics(lyrics_file)
+    asr_track = SubtitleTrack.read(srt_file, drop_filler=True)
+    cues = align_lyrics(asr_track, lyric_pairs)
+    report = alignment_report(cues, lyric_pairs, min_confidence)
+    report["confidences"] = [cue["confidence"] for cue in cues]
+    report["seconds"] = round(time.perf_counter() - started_at, 3)
+    print_alignment(cues, lyric_pairs, report)
+
+    if report["ok"] or write_low_confidence:
+        build_subtitle_track(cues, lyric_pairs).write(output_file)
+        print(f"✅ Aligned {len(cues)} cues locally in {report['seconds']:.2f}s "
+              f"(mean confidence {report['mean_confidence']:.2f}) -> {output_file}")
+    else:
+        print(f"⚠️ Low-confidence alignment ({len(report['low_confidence_cues'])} weak cues, "
+              f"{len(report['missing_lines'])} missing lines)")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Time lyric lines against auto-generated captions without an LLM.")
+    parser.add_argument("srt_file", help="Auto-generated (ASR) captions.")
+    parser.add_argument("lyrics_file", help="Lyrics: each Telugu line followed by its English meaning.")
+    parser.add_argument("output_file", help="Where to write the aligned SRT.")
+    parser.add_argument("--min_confidence", type=float, default=DEFAULT_MIN_CONFIDENCE, help="Per-cue confidence needed to accept the alignment (default: 0.6).")
+    parser.add_argument("--force", action="store_true", help="Write the SRT even if the alignment is low-confidence.")
+    parser.add_argument("--report", help="Also save the alignment report as JSON.")
+    args = parser.parse_args()
+
+    report = align_subtitles(args.srt_file, args.lyrics_file, args.output_file, args.min_confidence, args.force)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,144 @@
 import os
-import google.genai as genai
+import time
 from SubtitleHandler.validate_generated_subtitlefile import clean_and_validate_srt
+from SubtitleHandler.subtitle_track import SubtitleTrack, SrtStreamParser, format_timestamp
+from SubtitleHandler.compact_cues import CompactCueParser, FORMAT_DESCRIPTION, OUTPUT_FORMAT_DESCRIPTION, encode_cues
+from Utilities.llm_cache import ResponseCache, cached_generate, count
+from Utilities.llm_usage import measure_call, record_call, note_usage, reset_usage, last_usage
+
+# Streaming mode gives up once this many blocks of the response were malformed.
+MAX_BAD_BLOCKS = 3
 
 def load_file(path):
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
 
-def generate_subtitles_with_model(
-    model_name,
-    srt_file,
-    lyrics_file,
-    prompt_file,
-    output_file="final_subs.srt"
-):
+def call_gemini(model_name, prompt):
+    """
+    One generate_content call; returns the response text (token counts go to llm_usage).
+    """
+    client = get_gemini_client()
+    try:
+        response = client.models.generate_content(
+            model=model_name,
+            contents=prompt
+        )
+    except Exception as e:
+        raise RuntimeError(f"Error generating subtitles: {e}")
+    note_usage(response.usage_metadata)
+    return response.text
+
+_gemini_clients = {}
+
+def get_gemini_client():
+    """
+    One genai.Client per API key for the whole process (its HTTP connections are reused across songs).
+    """
+    import google.genai as genai
+
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise RuntimeError("Set GEMINI_API_KEY in your environment first")
+    if api_key not in _gemini_clients:
+        _gemini_clients[api_key] = genai.Client(api_key=api_key)
+    return _gemini_clients[api_key]
 
-    client = genai.Client(api_key=api_key)
+def stream_gemini(model_name, prompt):
+    """
+    Yields the response text chunk by chunk as Gemini generates it.
+    """
+    client = get_gemini_client()
+    try:
+        for chunk in client.models.generate_content_stream(model=model_name, contents=prompt):
+            note_usage(chunk.usage_metadata)
+            if chunk.text:
+                yield chunk.text
+    except Exception as e:
+        raise RuntimeError(f"Error generating subtitles: {e}")
 
-    # Validate chosen model
-    '''available_models = {m.name: m.supported_actions for m in client.models.list()}
-    if model_name not in available_models:
-        raise ValueError(f"Model '{model_name}' not found. Available models: {list(available_models.keys())}")
+# -------------------------------
+# Streaming write-out
+# -------------------------------
+def write_streamed_subtitles(chunks, output_file, max_cues=None, max_bad_blocks=MAX_BAD_BLOCKS, parser=None):
+    """
+    Parses cues out of a stream of text chunks and appends each valid cue to <output_file>.partial at once.
+    - parser decodes the chunks (default: SrtStreamParser; CompactCueParser for compact output)
+    - A cue is valid when it ends after it starts and does not start before the previous cue
+    - Only a complete, successful stream replaces output_file, so an earlier good file survives a failure
+    - Fails fast when more than max_bad_blocks blocks are malformed or more than max_cues cues arrive;
+      what was written is then left in <output_file>.partial
+    - Logs time to first cue and total latency; returns the raw response text
+    """
+    started_at = time.perf_counter()
+    state = {"written": 0, "invalid": 0, "previous_start": -1, "first_cue_seconds": None}
+    parser = parser or SrtStreamParser(drop_filler=True)
+    raw_chunks = []
 
-    if "generateContent" not in available_models[model_name]:
-        raise ValueError(f"Model '{model_name}' does not support generateContent. Supported actions: {available_models[model_name]}")
-    '''
-    print(f"Using model: {model_name}")
+    def write_cues(f, cues):
+        for start, end, text in cues:
+            if end <= start or start < state["previous_start"]:
+                state["invalid"] += 1
+                continue
+            state["written"] += 1
+            state["previous_start"] = start
+            f.write(f"{state['written']}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n")
+            f.flush()
+            if state["first_cue_seconds"] is None:
+                state["first_cue_seconds"] = time.perf_counter() - started_at
+                print(f"⏱️ First cue after {state['first_cue_seconds']:.2f}s")
+        bad_blocks = parser.rejected_blocks + state["invalid"]
+        if bad_blocks > max_bad_blocks:
+            raise RuntimeError(f"Malformed model output: {bad_blocks} bad blocks")
+        if max_cues is not None and state["written"] > max_cues:
+            raise RuntimeError(f"Model output exceeded the cue budget ({max_cues} cues)")
 
-    # Load inputs
-    srt_text = load_file(srt_file)
-    print("Loaded SRT file.")
-    lyrics_text = load_file(lyrics_file)
-    print("Loaded lyrics file.")
-    prompt_text = load_file(prompt_file)
-    print("Loaded prompt file.")
+    partial_file = f"{output_file}.partial"
+    with open(partial_file, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            raw_chunks.append(chunk)
+            write_cues(f, parser.feed(chunk))
+        write_cues(f, parser.close())
+    if not state["written"]:
+        raise RuntimeError("Model output contained no valid cues")
+    os.replace(partial_file, output_file)
+
+    total_seconds = time.perf_counter() - started_at
+    print(f"⏱️ Streamed {state['written']} cues in {total_seconds:.2f}s (first cue {state['first_cue_seconds']:.2f}s, "
+          f"{parser.rejected_blocks + state['invalid']} bad blocks skipped)")
+    return "".join(raw_chunks)
+
+def build_subtitle_prompt(prompt_text, srt_text, lyrics_text, encoding="srt"):
+    """
+    The full prompt; with encoding="compact", srt_text is compact cue lines (relative gaps)
+    and the answer is asked for as compact cue lines with absolute starts.
+    """
+    if encoding == "compact":
+        return f"""
+You are a subtitle generator. Follow these rules:
+{prompt_text}
+
+Answer in the compact cue output format below instead of SRT: the rules for SRT blocks apply to cues,
+but there is no numbering, no HH:MM:SS,mmm timestamps and nothing outside the cue lines.
+
+{OUTPUT_FORMAT_DESCRIPTION}
+
+{FORMAT_DESCRIPTION}
+
+Inputs:
+1. Original auto-generated Telugu captions, in compact cue format:
+{srt_text}
+
+2. Lyrics with English meaning:
+{lyrics_text}
 
-    # Build full prompt
-    full_prompt = f"""
+Task:
+- Create the new subtitles in the compact cue output format.
+- Each cue should contain one lyric (merge/split smartly).
+- Include IAST transcription + English meaning.
+- Remove bogus entries like [music], [aaa].
+- Output only cue lines, with absolute starts.
+    """
+    return f"""
 You are a subtitle generator. Follow these rules:
 {prompt_text}
 
@@ -56,24 +156,126 @@ Task:
 - Remove bogus entries like [music], [aaa].
 - Output must be valid SRT format.
     """
-    print("Generated full prompt for Gemini.")
-    # Call Gemini
-    try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=full_prompt
-        )
-    except Exception as e:
-        raise RuntimeError(f"Error generating subtitles: {e}")
 
-    raw_output = response.text
-    validated_output = clean_and_validate_srt(raw_output)
+def load_subtitle_prompt(srt_file, lyrics_file, prompt_file, prompt_encoding="srt"):
+    """
+    Reads the inputs of one song and builds its full prompt; returns (prompt, asr_track).
+    """
+    # Normalized through the track (filler and repeated index lines dropped), so the prompt carries less
+    asr_track = SubtitleTrack.read(srt_file, drop_filler=True)
+    srt_text = encode_cues(asr_track) if prompt_encoding == "compact" else asr_track.to_text()
+    print("Loaded SRT file.")
+    lyrics_text = load_file(lyrics_file)
+    print("Loaded lyrics file.")
+    prompt_text = load_file(prompt_file)
+    print("Loaded prompt file.")
+    return build_subtitle_prompt(prompt_text, srt_text, lyrics_text, prompt_encoding), asr_track
+
+def validate_generated_subtitles(raw_output, prompt_encoding="srt"):
+    """
+    Decodes (compact encoding) and validates a model response; returns the SRT text.
+    Raises RuntimeError when the response holds no valid cue, or more than MAX_BAD_BLOCKS compact lines
+    are malformed or start before the previous cue.
+    """
+    if prompt_encoding == "compact":
+        parser = CompactCueParser()
+        cues = parser.feed(raw_output or "") + parser.close()
+        if parser.rejected_blocks > MAX_BAD_BLOCKS:
+            raise RuntimeError(f"Malformed model output: {parser.rejected_blocks} bad cue lines")
+        track = SubtitleTrack()
+        for cue in cues:
+            track.append(*cue)
+        raw_output = track.to_text()
+    validated_output = clean_and_validate_srt(raw_output or "")
+    if not validated_output.strip():
+        raise RuntimeError("Model output contained no valid cues")
+    return validated_output
 
-    #Save the validated output
+def save_generated_subtitles(raw_output, output_file, prompt_encoding="srt"):
+    """
+    Validates a model response and writes the SRT; returns the cue count (raises on zero cues).
+    """
+    validated_output = validate_generated_subtitles(raw_output, prompt_encoding)
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(validated_output)
-
     print(f"Validated subtitles saved to {output_file}")
+    return len(SubtitleTrack.from_text(validated_output))
+
+def generate_subtitles_with_model(
+    model_name,
+    srt_file,
+    lyrics_file,
+    prompt_file,
+    output_file="final_subs.srt",
+    use_cache=True,
+    stream=False,
+    generate_fn=None,
+    prompt_encoding="srt",
+    usage_log=None,
+    label=None
+):
+    """
+    Regenerates the subtitles with Gemini from the ASR captions and the lyrics.
+    - An unchanged model + prompt is answered from the on-disk LLM response cache
+    - use_cache=False bypasses the cache (e.g. to get a fresh answer for the same inputs)
+    - stream=True writes each cue to output_file as soon as Gemini has produced it
+    - generate_fn(model_name, prompt) -> text can replace the Gemini call (e.g. a fake model in tests);
+      with stream=True it returns an iterator of text chunks instead (default: stream_gemini)
+    - prompt_encoding="compact" sends and asks back one line per cue (see compact_cues) instead of SRT;
+      the answer carries absolute starts, so one wrong time cannot shift the cues after it
+    - Tokens and latency of the call are printed and appended to usage_log (JSON lines) under label
+    """
+    # Validate chosen model
+    '''available_models = {m.name: m.supported_actions for m in client.models.list()}
+    if model_name not in available_models:
+        raise ValueError(f"Model '{model_name}' not found. Available models: {list(available_models.keys())}")
+
+    if "generateContent" not in available_models[model_name]:
+        raise ValueError(f"Model '{model_name}' does not support generateContent. Supported actions: {available_models[model_name]}")
+    '''
+    print(f"Using model: {model_name}")
+
+    # Load inputs and build the full prompt
+    full_prompt, asr_track = load_subtitle_prompt(srt_file, lyrics_file, prompt_file, prompt_encoding)
+    print(f"Generated full prompt for Gemini ({prompt_encoding} captions, {len(full_prompt)} chars).")
+    if generate_fn is None:
+        generate_fn = stream_gemini if stream else call_gemini
+    if stream:
+        # A cached response is replayed through the same incremental writer
+        cache = ResponseCache() if use_cache else None
+        cached_output = cache.get(model_name, full_prompt) if cache else None
+        if cached_output is not None:
+            try:
+                validate_generated_subtitles(cached_output, prompt_encoding)
+            except RuntimeError as e:
+                print(f"⚠️ Ignoring cached response that fails validation: {e}")
+                cached_output = None
+        if not cache:
+            count("bypassed")
+        chunks = [cached_output] if cached_output is not None else generate_fn(model_name, full_prompt)
+        parser = CompactCueParser(drop_filler=True) if prompt_encoding == "compact" else None
+        reset_usage()
+        started_at = time.perf_counter()
+        raw_output = write_streamed_subtitles(chunks, output_file, max_cues=max(20, 3 * len(asr_track)), parser=parser)
+        stats = {"seconds": round(time.perf_counter() - started_at, 3), **last_usage()}
+        record_call(usage_log, label, model_name, prompt_encoding, full_prompt, stats, cached_output is not None)
+        if cache and cached_output is None:
+            cache.put(model_name, full_prompt, raw_output)
+        print(f"Validated subtitles saved to {output_file}")
+        return
+
+    # Call Gemini
+    stats = {}
+
+    def measured_generate(model, prompt):
+        text, call_stats = measure_call(generate_fn, model, prompt)
+        stats.update(call_stats)
+        return text
+
+    raw_output, cache_hit = cached_generate(model_name, full_prompt, measured_generate, use_cache=use_cache,
+                                            validate=lambda text: validate_generated_subtitles(text, prompt_encoding))
+    record_call(usage_log, label, model_name, prompt_encoding, full_prompt, stats, cache_hit)
+    save_generated_subtitles(raw_output, output_file, prompt_encoding)
 
     
 
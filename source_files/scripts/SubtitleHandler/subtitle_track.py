@@ -0,0 +1,282 @@
+import re
+from array import array
+from itertools import compress, repeat
+from operator import add, and_, gt, lt, mul, sub
+
+TIMESTAMP_RE = re.compile(r"(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})")
+# Bogus filler lines the ASR/LLM emits, e.g. [music], [aaa]
+FILLER_RE = re.compile(r"\[.*?\]")
+
+# -------------------------------
+# Timestamps
+# -------------------------------
+def parse_timestamp_match(match):
+    """
+    (start_ms, end_ms) from a TIMESTAMP_RE match.
+    """
+    h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(x) for x in match.groups())
+    return ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1, ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2
+
+def format_timestamp(ms):
+    """
+    Milliseconds -> HH:MM:SS,mmm
+    """
+    seconds, ms = divmod(int(ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02},{ms:03}"
+
+# -------------------------------
+# Incremental parser
+# -------------------------------
+class SrtStreamParser:
+    """
+    Line-driven SRT parser that hands back each cue as soon as its block is complete.
+    - feed() accepts arbitrary text chunks (e.g. from a streaming model response)
+    - rejected_blocks counts blocks that had content but no valid timestamp or no text
+      (a block holding only filler is dropped without counting)
+    - An all-digit line is an index only at the start of a block, right before a timestamp,
+      or as a repeat of the block's index right after its timestamp; anywhere else it is cue text
+    """
+
+    def __init__(self, drop_filler=False):
+        self.drop_filler = drop_filler
+        self.partial_line = ""
+        self.start = self.end = None
+        self.text_lines = []
+        self.stray_content = False
+        self.only_filler = False
+        self.index = None
+        self.pending_digits = None
+        self.rejected_blocks = 0
+
+    def finish_block(self):
+        """
+        Ends the current block; returns its (start_ms, end_ms, text) cue or None.
+        """
+        if self.pending_digits is not None:
+            self.text_lines.append(self.pending_digits)
+            self.pending_digits = None
+        cue = None
+        if self.start is not None and self.text_lines:
+            cue = (self.start, self.end, "\n".join(self.text_lines))
+        elif (self.start is not None and not self.only_filler) or self.stray_content:
+            self.rejected_blocks += 1
+        self.start = self.end = None
+        self.text_lines = []
+        self.stray_content = False
+        self.only_filler = False
+        self.index = None
+        return cue
+
+    def push_line(self, line):
+        """
+        Consumes one line; returns a completed cue or None.
+        """
+        line = line.strip()
+        match = TIMESTAMP_RE.search(line) if "-->" in line else None
+        # A digit line inside a cue is only known to be the next index once a timestamp follows
+        pending, self.pending_digits = self.pending_digits, None
+        if pending is not None and not match:
+            self.text_lines.append(pending)
+        if match or not line:
+            index = pending if pending is not None else (self.index if self.start is None else None)
+            cue = self.finish_block()
+            if match:
+                self.start, self.end = parse_timestamp_match(match)
+                self.index = index
+            return cue
+        if line.startswith("```"):
+            # The code fences LLMs like to wrap SRT in
+            return None
+        if line.isdigit():
+            if self.start is None:
+                self.index = line
+            elif not self.text_lines and line == self.index:
+                pass  # Regenerated files repeat the index inside the cue
+            else:
+                self.pending_digits = line
+            return None
+        if self.start is None:
+            self.stray_content = True
+            return None
+        if self.drop_filler and FILLER_RE.match(line):
+            self.only_filler = not self.text_lines
+        else:
+            self.text_lines.append(line)
+        return None
+
+    def feed(self, text):
+        """
+        Consumes a chunk of text; returns the cues it completed.
+        """
+        lines = (self.partial_line + text).split("\n")
+        self.partial_line = lines.pop()
+        return [cue for cue in map(self.push_line, lines) if cue]
+
+    def close(self):
+        """
+        Flushes the last line and block; returns the remaining cues.
+        """
+        cues = [cue for cue in [self.push_line(self.partial_line)] if cue]
+        self.partial_line = ""
+        cue = self.finish_block()
+        return cues + ([cue] if cue else [])
+
+# -------------------------------
+# Track
+# -------------------------------
+class SubtitleTrack:
+    """
+    A subtitle track stored column-wise: start and end times as integer milliseconds
+    in two array('q') columns, plus a list of cue texts (lines joined with "\\n").
+    - Timeline operations return a new track; each is a few whole-column passes (map/compress
+      over C builtins, no Python code per cue)
+    - Cue i is (starts[i], ends[i], texts[i])
+    """
+    __slots__ = ("starts", "ends", "texts")
+
+    def __init__(self, starts=(), ends=(), texts=()):
+        self.starts = array("q", starts)
+        self.ends = array("q", ends)
+        self.texts = list(texts)
+        if not len(self.starts) == len(self.ends) == len(self.texts):
+            raise ValueError("starts, ends and texts must have the same length")
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.texts)
+
+    def __eq__(self, other):
+        return (isinstance(other, SubtitleTrack) and self.starts == other.starts
+                and self.ends == other.ends and self.texts == other.texts)
+
+    def __repr__(self):
+        return f"SubtitleTrack({len(self)} cues)"
+
+    def append(self, start_ms, end_ms, text):
+        self.starts.append(int(start_ms))
+        self.ends.append(int(end_ms))
+        self.texts.append(text)
+
+    # ---- construction ----
+    @classmethod
+    def from_seconds(cls, cues):
+        """
+        Builds a track from (start_seconds, end_seconds, text) tuples.
+        """
+        track = cls()
+        for start, end, text in cues:
+            track.append(round(start * 1000), round(end * 1000), text)
+        return track
+
+    def to_seconds(self):
+        return [(start / 1000, end / 1000, text) for start, end, text in self]
+
+    @classmethod
+    def parse(cls, lines, drop_filler=False):
+        """
+        Parses SRT text from any iterable of lines (an open file streams; nothing else is held).
+        - Index lines, and a repeat of the index right after the timestamp (our regenerated files have one), are dropped;
+          other all-digit lines are cue text
+        - Blocks without a valid timestamp or without text are skipped
+        - drop_filler removes lines such as [music]
+        """
+        track = cls()
+        parser = SrtStreamParser(drop_filler=drop_filler)
+        for line in lines:
+            cue = parser.push_line(line)
+            if cue:
+                track.append(*cue)
+        cue = parser.finish_block()
+        if cue:
+            track.append(*cue)
+        return track
+
+    @classmethod
+    def from_text(cls, srt_text, drop_filler=False):
+        return cls.parse(srt_text.splitlines(), drop_filler=drop_filler)
+
+    @classmethod
+    def read(cls, srt_file, drop_filler=False):
+        with open(srt_file, "r", encoding="utf-8") as f:
+            return cls.parse(f, drop_filler=drop_filler)
+
+    # ---- serialization ----
+    def iter_blocks(self):
+        """
+        Yields one numbered SRT block per cue, ready to be written.
+        """
+        for index, (start, end, text) in enumerate(self, start=1):
+            yield f"{index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n"
+
+    def to_text(self):
+        return "".join(self.iter_blocks())
+
+    def write(self, srt_file):
+        with open(srt_file, "w", encoding="utf-8") as f:
+            f.writelines(self.iter_blocks())
+
+    # ---- timeline operations ----
+    def _select(self, keep):
+        keep = array("b", keep)
+        return SubtitleTrack(compress(self.starts, keep), compress(self.ends, keep), compress(self.texts, keep))
+
+    def drop_empty(self):
+        """
+        Drops cues that do not end after they start.
+        """
+        return self._select(map(gt, self.ends, self.starts))
+
+    def shift(self, offset_ms):
+        """
+        Moves every cue by offset_ms; cues pushed before 0 are cut at 0 (and dropped if empty).
+        """
+        starts = array("q", map(max, map(add, self.starts, repeat(offset_ms)), repeat(0)))
+        ends = array("q", map(max, map(add, self.ends, repeat(offset_ms)), repeat(0)))
+        return SubtitleTrack(starts, ends, self.texts).drop_empty()
+
+    def scale(self, factor, origin_ms=0):
+        """
+        Stretches the timeline around origin_ms (e.g. 25/23.976 to fix a frame-rate mismatch).
+        """
+        def scaled(column):
+            return map(round, map(add, map(mul, map(sub, column, repeat(origin_ms)), repeat(factor)), repeat(origin_ms)))
+
+        return SubtitleTrack(scaled(self.starts), scaled(self.ends), self.texts)
+
+    def clip(self, start_ms, end_ms):
+        """
+        Keeps what falls inside [start_ms, end_ms), trimming cues that cross the edges.
+        """
+        starts = array("q", map(max, self.starts, repeat(start_ms)))
+        ends = array("q", map(min, self.ends, repeat(end_ms)))
+        return SubtitleTrack(starts, ends, self.texts).drop_empty()
+
+    def overlapping(self, start_ms, end_ms):
+        """
+        The cues that overlap [start_ms, end_ms), untrimmed.
+        """
+        return self._select(map(and_, map(gt, self.ends, repeat(start_ms)), map(lt, self.starts, repeat(end_ms))))
+
+    def sorted(self):
+        order = sorted(range(len(self)), key=list(zip(self.starts, self.ends)).__getitem__)
+        return SubtitleTrack(map(self.starts.__getitem__, order), map(self.ends.__getitem__, order),
+                             map(self.texts.__getitem__, order))
+
+    def merge(self, other):
+        """
+        Interleaves two tracks by start time (a stable sort: cues with identical times keep self first).
+        """
+        return SubtitleTrack(self.starts + other.starts, self.ends + other.ends, self.texts + other.texts).sorted()
+
+    def resolve_overlaps(self):
+        """
+        Sorts the cues and ends each one where the next starts; cues left empty are dropped.
+        """
+        track = self.sorted()
+        next_starts = track.starts[1:] + array("q", [track.ends[-1] if len(track) else 0])
+        ends = array("q", map(min, track.ends, next_starts))
+        return SubtitleTrack(track.starts, ends, track.texts).drop_empty()
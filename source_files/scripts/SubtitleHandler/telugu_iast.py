@@ -0,0 +1,70 @@
+import re
+import unicodedata
+
+# Telugu -> IAST, with ē/ō for the long Dravidian vowels (as in our subtitle files).
+INDEPENDENT_VOWELS = {
+    "అ": "a", "ఆ": "ā", "ఇ": "i", "ఈ": "ī", "ఉ": "u", "ఊ": "ū", "ఋ": "ṛ", "ౠ": "ṝ", "ఌ": "ḷ", "ౡ": "ḹ",
+    "ఎ": "e", "ఏ": "ē", "ఐ": "ai", "ఒ": "o", "ఓ": "ō", "ఔ": "au",
+}
+VOWEL_SIGNS = {
+    "ా": "ā", "ి": "i", "ీ": "ī", "ు": "u", "ూ": "ū", "ృ": "ṛ", "ౄ": "ṝ", "ౢ": "ḷ", "ౣ": "ḹ",
+    "ె": "e", "ే": "ē", "ై": "ai", "ొ": "o", "ో": "ō", "ౌ": "au",
+}
+CONSONANTS = {
+    "క": "k", "ఖ": "kh", "గ": "g", "ఘ": "gh", "ఙ": "ṅ",
+    "చ": "c", "ఛ": "ch", "జ": "j", "ఝ": "jh", "ఞ": "ñ",
+    "ట": "ṭ", "ఠ": "ṭh", "డ": "ḍ", "ఢ": "ḍh", "ణ": "ṇ",
+    "త": "t", "థ": "th", "ద": "d", "ధ": "dh", "న": "n",
+    "ప": "p", "ఫ": "ph", "బ": "b", "భ": "bh", "మ": "m",
+    "య": "y", "ర": "r", "ఱ": "ṟ", "ల": "l", "ళ": "ḷ", "ఴ": "ḻ", "వ": "v",
+    "శ": "ś", "ష": "ṣ", "స": "s", "హ": "h",
+}
+VIRAMA = "్"
+ANUSVARA = "ం"
+# The anusvara is written as the nasal of the consonant class that follows it.
+NASAL_BEFORE = {}
+for nasal, group in (("ṅ", "కఖగఘ"), ("ñ", "చఛజఝ"), ("ṇ", "టఠడఢ"), ("n", "తథదధ"), ("m", "పఫబభ")):
+    NASAL_BEFORE.update(dict.fromkeys(group, nasal))
+OTHER_SIGNS = {"ః": "ḥ", "ఁ": "m̐", "ఽ": "'"}
+DIGITS = {chr(0x0C66 + i): str(i) for i in range(10)}
+IGNORED = {"‌", "‍"}
+
+TELUGU_RE = re.compile(r"[ఀ-౿]")
+
+def contains_telugu(text):
+    return bool(TELUGU_RE.search(text))
+
+def to_iast(text):
+    """
+    Transliterates Telugu script to IAST; other characters pass through unchanged.
+    """
+    out = []
+    chars = [c for c in text if c not in IGNORED]
+    for i, char in enumerate(chars):
+        following = chars[i + 1] if i + 1 < len(chars) else ""
+        if char in CONSONANTS:
+            out.append(CONSONANTS[char])
+            # Inherent vowel unless a vowel sign or virama follows
+            if following not in VOWEL_SIGNS and following != VIRAMA:
+                out.append("a")
+        elif char in VOWEL_SIGNS:
+            out.append(VOWEL_SIGNS[char])
+        elif char in INDEPENDENT_VOWELS:
+            out.append(INDEPENDENT_VOWELS[char])
+        elif char == ANUSVARA:
+            out.append(NASAL_BEFORE.get(following, "ṁ"))
+        elif char == VIRAMA:
+            continue
+        else:
+            out.append(OTHER_SIGNS.get(char, DIGITS.get(char, char)))
+    return "".join(out)
+
+def phonetic_key(text):
+    """
+    Loose spelling-independent key for fuzzy matching: IAST without diacritics, spaces,
+    punctuation or doubled letters, and with aspiration dropped (ASR often confuses them).
+    """
+    ascii_text = unicodedata.normalize("NFD", to_iast(text).lower())
+    ascii_text = "".join(c for c in ascii_text if c.isascii() and c.isalpha())
+    ascii_text = re.sub(r"([kgcjtdpb])h", r"\1", ascii_text)
+    return re.sub(r"(.)\1+", r"\1", ascii_text)
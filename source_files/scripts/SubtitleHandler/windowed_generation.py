@@ -0,0 +1,185 @@
+import time
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
+
+from SubtitleHandler.subtitle_track import SubtitleTrack
+from SubtitleHandler.telugu_iast import contains_telugu, phonetic_key
+from SubtitleHandler.lyric_aligner import parse_lyrics, align_lyrics
+from SubtitleHandler.compact_cues import encode_cues
+from SubtitleHandler.subtitle_generator import load_file, build_subtitle_prompt, call_gemini, validate_generated_subtitles
+from Utilities.llm_cache import cached_generate
+from Utilities.llm_usage import measure_call, record_call
+
+DEFAULT_WINDOW_SECONDS = 120
+DEFAULT_OVERLAP_SECONDS = 15
+DEFAULT_MAX_CONCURRENCY = 4
+# Lyric keys at least this similar (difflib ratio) are the same line sung across a window boundary.
+SAME_LYRIC_SIMILARITY = 0.6
+
+# -------------------------------
+# Windows
+# -------------------------------
+def plan_windows(asr_track, window_ms, overlap_ms):
+    """
+    Cuts the caption timeline into windows.
+    - Each window owns a core span [core_start, core_end); the cores tile the timeline
+    - The model sees the core plus overlap_ms of context on each side
+    - Returns dicts with core_start, core_end, start, end (all ms)
+    """
+    if not len(asr_track):
+        return []
+    timeline_end = max(asr_track.ends)
+    windows = []
+    core_start = 0
+    while core_start < timeline_end:
+        core_end = min(core_start + window_ms, timeline_end)
+        # A short tail is folded into the previous window instead of becoming its own call
+        if timeline_end - core_end < window_ms / 4:
+            core_end = timeline_end
+        windows.append({"core_start": core_start, "core_end": core_end,
+                        "start": max(0, core_start - overlap_ms), "end": core_end + overlap_ms})
+        core_start = core_end
+    return windows
+
+def parse_lyric_stanzas(lyrics_file):
+    """
+    Splits lyrics.txt at blank lines. Returns (stanza_text, [lyric line indices]) pairs,
+    with indices numbered like lyric_aligner.parse_lyrics.
+    """
+    stanzas, current, indices = [], [], []
+    line_index = 0
+    with open(lyrics_file, "r", encoding="utf-8") as f:
+        for line in list(f) + [""]:
+            if line.strip():
+                current.append(line.rstrip())
+                if contains_telugu(line):
+                    indices.append(line_index)
+                    line_index += 1
+            elif current:
+                stanzas.append(("\n".join(current), indices))
+                current, indices = [], []
+    return stanzas
+
+def window_lyrics(window, cues, stanzas):
+    """
+    The stanzas sung inside the window, found with the local aligner; all of them if none matched.
+    """
+    lines = {cue["line"] for cue in cues if cue["end_ms"] > window["start"] and cue["start_ms"] < window["end"]}
+    selected = [text for text, indices in stanzas if lines & set(indices)]
+    return "\n\n".join(selected or [text for text, _ in stanzas])
+
+# -------------------------------
+# Stitching
+# -------------------------------
+def lyric_key(text):
+    """
+    Phonetic key of a cue's first (IAST) line, as the aligner compares lyric lines.
+    """
+    return phonetic_key(text.split("\n")[0])
+
+def same_lyric(a, b):
+    """
+    True when two cues from different windows are the same sung line: they overlap in time and
+    their lyric keys are close (windows may transcribe or time a boundary line slightly differently).
+    """
+    if a["window"] == b["window"] or a["end"] <= b["start"] or b["end"] <= a["start"]:
+        return False
+    if not a["key"] or not b["key"]:
+        return a["text"] == b["text"]
+    return SequenceMatcher(None, a["key"], b["key"], autojunk=False).ratio() >= SAME_LYRIC_SIMILARITY
+
+def core_depth(midpoint, window, first, last):
+    """
+    How far inside the window's core a cue's midpoint lies (negative outside it). The timeline
+    before the first core and after the last one belongs to those windows.
+    """
+    before = float("inf") if first else midpoint - window["core_start"]
+    after = float("inf") if last else window["core_end"] - midpoint
+    return min(before, after)
+
+def stitch_windows(window_tracks, windows):
+    """
+    Joins the per-window results.
+    - Every window's cues are candidates; cues of different windows that are the same lyric line
+      (see same_lyric) keep only the one lying deepest inside its window's core, where the model
+      had the most context. A boundary cue a window dropped is still taken from its neighbour.
+    - Remaining overlaps are resolved (each cue ends where the next starts)
+    """
+    candidates = []
+    for index, (track, window) in enumerate(zip(window_tracks, windows)):
+        for start, end, text in track:
+            candidates.append({"start": start, "end": end, "text": text, "window": index, "key": lyric_key(text),
+                               "depth": core_depth((start + end) // 2, window, index == 0, index == len(windows) - 1)})
+
+    kept = []
+    for candidate in sorted(candidates, key=lambda c: -c["depth"]):
+        if not any(same_lyric(candidate, other) for other in kept):
+            kept.append(candidate)
+    stitched = SubtitleTrack((c["start"] for c in kept), (c["end"] for c in kept), (c["text"] for c in kept)).sorted()
+    return stitched.resolve_overlaps()
+
+# -------------------------------
+# Generation
+# -------------------------------
+def generate_subtitles_windowed(
+    model_name,
+    srt_file,
+    lyrics_file,
+    prompt_file,
+    output_file="final_subs.srt",
+    window_seconds=DEFAULT_WINDOW_SECONDS,
+    overlap_seconds=DEFAULT_OVERLAP_SECONDS,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    use_cache=True,
+    generate_fn=call_gemini,
+    prompt_encoding="srt",
+    usage_log=None,
+    label=None
+):
+    """
+    Regenerates subtitles for a long track as overlapping windows processed concurrently.
+    - Each prompt carries only the window's captions and the stanzas sung in it, so outputs
+      stay short (lower latency, no output-token truncation)
+    - At most max_concurrency model calls run at once; each goes through the LLM response cache
+    - generate_fn(model_name, prompt) -> text can replace the Gemini call
+    - prompt_encoding and usage_log as in generate_subtitles_with_model (one usage entry per window)
+    - Returns the stitched SubtitleTrack (also written to output_file)
+    """
+    started_at = time.perf_counter()
+    asr_track = SubtitleTrack.read(srt_file, drop_filler=True)
+    prompt_text = load_file(prompt_file)
+    stanzas = parse_lyric_stanzas(lyrics_file)
+    aligned_cues = align_lyrics(asr_track, parse_lyrics(lyrics_file))
+    windows = plan_windows(asr_track, window_seconds * 1000, overlap_seconds * 1000)
+    print(f"Using model: {model_name}, {len(windows)} windows of {window_seconds}s (+{overlap_seconds}s overlap), "
+          f"{max_concurrency} at a time")
+
+    def run_window(window):
+        window_started_at = time.perf_counter()
+        window_track = asr_track.overlapping(window["start"], window["end"])
+        if not len(window_track):
+            return SubtitleTrack()
+        captions_text = encode_cues(window_track) if prompt_encoding == "compact" else window_track.to_text()
+        prompt = build_subtitle_prompt(prompt_text, captions_text, window_lyrics(window, aligned_cues, stanzas), prompt_encoding)
+        stats = {}
+
+        def measured_generate(model, prompt):
+            text, call_stats = measure_call(generate_fn, model, prompt)
+            stats.update(call_stats)
+            return text
+
+        raw_output, cache_hit = cached_generate(model_name, prompt, measured_generate, use_cache=use_cache,
+                                                validate=lambda text: validate_generated_subtitles(text, prompt_encoding))
+        record_call(usage_log, label, model_name, prompt_encoding, prompt, stats, cache_hit)
+        track = SubtitleTrack.from_text(validate_generated_subtitles(raw_output, prompt_encoding))
+        print(f"  window {window['core_start'] / 1000:.0f}-{window['core_end'] / 1000:.0f}s: {len(track)} cues "
+              f"in {time.perf_counter() - window_started_at:.1f}s{' (cached)' if cache_hit else ''}")
+        return track
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        window_tracks = list(pool.map(run_window, windows))
+
+    track = stitch_windows(window_tracks, windows)
+    track.write(output_file)
+    print(f"Validated subtitles saved to {output_file} ({len(track)} cues in {time.perf_counter() - started_at:.1f}s)")
+    return track
@@ -0,0 +1,121 @@
+import os
+import time
+
+# -------------------------------
+# Helpers
+# -------------------------------
+def remove_if_exists(path):
+    """
+    Removes path; a file another process already removed is not an error.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# -------------------------------
+# Cache base
+# -------------------------------
+class FileCache:
+    """
+    A directory of cache entries with size-bounded LRU eviction, shared by the render and LLM caches.
+    - An entry's mtime is its last access time, so no shared index file is needed and
+      several processes can use (and prune) the same cache concurrently
+    - Subclasses name their entries (entry_key) and the sidecar files removed with them (entry_files)
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_key(self, name):
+        """
+        The key of the entry stored in file `name`, or None for sidecars and temporary files.
+        """
+        raise NotImplementedError
+
+    def entry_files(self, entry):
+        return [entry["path"]]
+
+    def touch(self, path):
+        """
+        Marks an entry as just used. Returns False when it was evicted meanwhile.
+        """
+        try:
+            os.utime(path, None)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def entries(self):
+        """
+        Returns the entries as dicts (key, path, size, last_access), least recently used first.
+        """
+        found = []
+        for name in os.listdir(self.cache_dir):
+            key = self.entry_key(name)
+            if key is None:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Evicted by another process between listdir and stat
+                continue
+            found.append({"key": key, "path": path, "size": stat.st_size, "last_access": stat.st_mtime})
+        return sorted(found, key=lambda e: e["last_access"])
+
+    def prune(self, max_bytes=None):
+        """
+        Evicts least recently used entries until the cache fits in max_bytes.
+        Returns the number of entries removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(e["size"] for e in entries)
+        removed = 0
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            for path in self.entry_files(entry):
+                remove_if_exists(path)
+            total -= entry["size"]
+            removed += 1
+        return removed
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(entries),
+            "total_bytes": sum(e["size"] for e in entries),
+            "max_bytes": self.max_bytes,
+            "oldest_access": entries[0]["last_access"] if entries else None,
+        }
+
+    def describe(self):
+        """
+        Lines printed by the caches' `stats` command.
+        """
+        stats = self.stats()
+        lines = [
+            f"Cache dir:  {stats['cache_dir']}",
+            f"Entries:    {stats['entries']}",
+            f"Size:       {stats['total_bytes'] / 1024 ** 2:.1f} MB of {stats['max_bytes'] / 1024 ** 2:.1f} MB",
+        ]
+        if stats["oldest_access"]:
+            lines.append(f"Oldest use: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats['oldest_access']))}")
+        return lines
+
+def run_cache_command(cache, command):
+    """
+    stats / prune / clear, the commands of every cache CLI.
+    """
+    if command == "stats":
+        print("\n".join(cache.describe()))
+    elif command == "prune":
+        print(f"🧹 Removed {cache.prune()} entries")
+    else:
+        print(f"🧹 Removed {cache.prune(max_bytes=0)} entries")
+    return 0
@@ -1,4 +1,9 @@
 import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 import google.auth.exceptions
 
 
@@ -6,37 +11,112 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 
+from Utilities.file_lock import file_lock
+
 # Scope defines the level of access we request.
 # Here: permission to upload videos to YouTube.
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload", "https://www.googleapis.com/auth/youtube.force-ssl"]
 
+# The token store lives next to main.py, whatever the working directory is.
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN_FILE = os.path.join(SCRIPT_DIR, "token.json")
+CLIENT_SECRET_FILE = os.path.join(SCRIPT_DIR, "client_secret.json")
+
+# Tokens are refreshed this long before they expire, so no API call waits on a refresh.
+REFRESH_MARGIN = timedelta(minutes=5)
+
+def utc_now():
+    """
+    Current time as naive UTC, comparable with google-auth's (naive UTC) expiry.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# -------------------------------
+# Token store (shared by all processes)
+# -------------------------------
+@contextmanager
+def token_lock(token_file=TOKEN_FILE):
+    """
+    Exclusive lock on <token_file>.lock, held while the token is read, refreshed or written.
+    """
+    with file_lock(f"{token_file}.lock"):
+        yield
+
+def needs_refresh(creds):
+    """
+    True when the token is missing, expired or expires within REFRESH_MARGIN.
+    """
+    if not creds.token:
+        return True
+    if not creds.expiry:
+        return False
+    return creds.expiry - utc_now() < REFRESH_MARGIN
+
+def save_token(creds, token_file=TOKEN_FILE):
+    """
+    Writes the token atomically, so a reader never sees a half-written file.
+    """
+    tmp_file = f"{token_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        f.write(creds.to_json())
+    os.replace(tmp_file, token_file)
+
+def load_token(token_file=TOKEN_FILE):
+    if os.path.exists(token_file):
+        return Credentials.from_authorized_user_file(token_file, SCOPES)
+    return None
+
+def refresh_shared(creds, token_file=TOKEN_FILE):
+    """
+    Refreshes creds in place, at most once across processes.
+    - Under the lock, a token another process already refreshed is adopted instead of refreshing again
+    """
+    with token_lock(token_file):
+        stored = load_token(token_file)
+        if stored and not needs_refresh(stored):
+            creds.token = stored.token
+            creds.expiry = stored.expiry
+            return creds
+        creds.refresh(Request())
+        save_token(creds, token_file)
+        print("🔄 Token refreshed")
+    return creds
+
 # -------------------------------
 # Authentication
 # -------------------------------
-def get_credentials():
+def usable_token(creds):
+    """
+    True when creds are valid or can be refreshed without a browser login.
+    """
+    return bool(creds) and (creds.valid or bool(creds.refresh_token))
+
+def get_credentials(token_file=TOKEN_FILE):
     """
     Handles authentication with Google OAuth.
-    - Reuses token.json if available
-    - Refreshes expired tokens
-    - Falls back to browser login if needed
+    - Reuses token.json (next to main.py) if available
+    - Refreshes expired tokens; concurrent processes share one refresh
+    - Falls back to browser login if needed; the login runs outside the token lock, so other
+      processes (and the background refresher) are not blocked while someone uses the browser
     """
     creds = None
     try:
-        if os.path.exists("token.json"):
-            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-                print("🔄 Token refreshed")
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file("client_secret.json", SCOPES)
-                creds = flow.run_local_server(port=0)
-                print("🌐 Logged in via browser")
-
-            with open("token.json", "w") as token_file:
-                token_file.write(creds.to_json())
-                print("💾 token.json saved")
+        with token_lock(token_file):
+            creds = load_token(token_file)
+        if not usable_token(creds):
+            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
+            login_creds = flow.run_local_server(port=0)
+            print("🌐 Logged in via browser")
+            with token_lock(token_file):
+                # Another process may have logged in meanwhile; keep its token
+                creds = load_token(token_file)
+                if not usable_token(creds):
+                    creds = login_creds
+                    save_token(creds, token_file)
+                    print("💾 token.json saved")
+
+        if needs_refresh(creds):
+            refresh_shared(creds, token_file)
 
     except google.auth.exceptions.GoogleAuthError as e:
         print("❌ Authentication error:", e)
@@ -44,4 +124,47 @@ def get_credentials():
 
     return creds
 
+# -------------------------------
+# Background refresh
+# -------------------------------
+def seconds_until_refresh(creds):
+    if not creds.expiry:
+        return None
+    return (creds.expiry - REFRESH_MARGIN - utc_now()).total_seconds()
+
+def start_background_refresh(creds, token_file=TOKEN_FILE):
+    """
+    Keeps creds fresh from a daemon thread, so API calls never block on an OAuth refresh.
+    - Wakes shortly before the refresh margin (with jitter, so processes don't wake together)
+    """
+    def refresh_loop():
+        while True:
+            wait_seconds = seconds_until_refresh(creds)
+            if wait_seconds is None:
+                return
+            time.sleep(max(0, wait_seconds) + random.uniform(0, 30))
+            try:
+                refresh_shared(creds, token_file)
+            except Exception as e:
+                print(f"⚠️ Background token refresh failed ({e}); retrying in 60s")
+                time.sleep(60)
 
+    thread = threading.Thread(target=refresh_loop, name="token-refresh", daemon=True)
+    thread.start()
+    return thread
+
+_default_creds = None
+_default_creds_lock = threading.Lock()
+
+def get_default_credentials():
+    """
+    Credentials shared by everything in this process, loaded on first use instead of at import
+    and kept fresh in the background.
+    """
+    global _default_creds
+    with _default_creds_lock:
+        if _default_creds is None:
+            _default_creds = get_credentials()
+            if _default_creds:
+                start_background_refresh(_default_creds)
+    return _default_creds
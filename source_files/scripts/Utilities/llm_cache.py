@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+
+from Utilities.file_cache import FileCache, remove_if_exists, run_cache_command
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(SCRIPT_DIR, '..', 'cache', 'llm')
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+DEFAULT_MAX_BYTES = 200 * 1024 ** 2  # 200 MB
+
+# Hit/miss counters for this process (all caches together).
+counters = {"hits": 0, "misses": 0, "expired": 0, "bypassed": 0, "stores": 0}
+_counters_lock = threading.Lock()
+
+def count(event):
+    with _counters_lock:
+        counters[event] += 1
+
+# -------------------------------
+# Keys
+# -------------------------------
+def response_key(model_name, prompt):
+    """
+    Cache key of a model call: the model name plus the fully built prompt.
+    """
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+# -------------------------------
+# Cache
+# -------------------------------
+class ResponseCache(FileCache):
+    """
+    On-disk cache of model responses with a TTL and size-bounded LRU eviction (see FileCache).
+    - One <key>.json file per response (model, creation time, text)
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+        self.ttl_seconds = ttl_seconds
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def entry_key(self, name):
+        return name[:-len(".json")] if name.endswith(".json") else None
+
+    def get(self, model_name, prompt):
+        """
+        Returns the cached response text, or None on a miss or an expired entry.
+        """
+        path = self._entry_path(response_key(model_name, prompt))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            count("misses")
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            remove_if_exists(path)
+            count("expired")
+            count("misses")
+            return None
+        self.touch(path)
+        count("hits")
+        return entry["text"]
+
+    def put(self, model_name, prompt, text, metadata=None):
+        path = self._entry_path(response_key(model_name, prompt))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model_name, "created": time.time(), "text": text, "metadata": metadata or {}}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        count("stores")
+        self.prune()
+
+    def stats(self):
+        return {**super().stats(), "ttl_seconds": self.ttl_seconds, **counters}
+
+    def describe(self):
+        return super().describe() + [f"TTL:        {self.ttl_seconds / 86400:.0f} days"]
+
+def cached_generate(model_name, prompt, generate_fn, use_cache=True, cache=None, validate=None):
+    """
+    Returns generate_fn(model_name, prompt), reusing a cached response for the same model and prompt.
+    - use_cache=False bypasses the cache completely (no read, no write)
+    - validate(text) raises for an unusable response; such a response is never stored, and a
+      cached one that no longer validates is treated as a miss
+    - Returns (text, cache_hit)
+    """
+    if not use_cache:
+        count("bypassed")
+        text = generate_fn(model_name, prompt)
+        if validate:
+            validate(text)
+        return text, False
+    cache = cache or ResponseCache()
+    text = cache.get(model_name, prompt)
+    if text is not None:
+        try:
+            if validate:
+                validate(text)
+            print(f"⚡ LLM cache hit ({model_name}); hits {counters['hits']}, misses {counters['misses']}")
+            return text, True
+        except Exception as e:
+            print(f"⚠️ Ignoring cached response that fails validation: {e}")
+    text = generate_fn(model_name, prompt)
+    if validate:
+        validate(text)
+    if text:
+        cache.put(model_name, prompt, text)
+    return text, False
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and prune the LLM response cache.")
+    parser.add_argument("command", choices=["stats", "prune", "clear"], help="stats: show usage; prune: evict LRU entries; clear: remove everything.")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Cache directory (default: source_files/cache/llm).")
+    parser.add_argument("--max_bytes", type=int, default=DEFAULT_MAX_BYTES, help="Size bound used by prune (default: 200 MB).")
+    args = parser.parse_args()
+
+    return run_cache_command(ResponseCache(args.cache_dir, max_bytes=args.max_bytes), args.command)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+# Token counts reported by the last model call made on this thread (see note_usage).
+_last_call = threading.local()
+_log_lock = threading.Lock()
+
+# -------------------------------
+# Measuring
+# -------------------------------
+def note_usage(usage_metadata):
+    """
+    Called by the Gemini wrappers with response.usage_metadata (for streams, the last chunk's).
+    """
+    if usage_metadata is None:
+        return
+    _last_call.tokens = {
+        "prompt_tokens": getattr(usage_metadata, "prompt_token_count", None),
+        "output_tokens": getattr(usage_metadata, "candidates_token_count", None),
+    }
+
+def reset_usage():
+    _last_call.tokens = None
+
+def last_usage():
+    """
+    prompt_tokens/output_tokens of the last call on this thread (None when the model did not report them).
+    """
+    return getattr(_last_call, "tokens", None) or {"prompt_tokens": None, "output_tokens": None}
+
+def measure_call(generate_fn, model_name, prompt):
+    """
+    Runs generate_fn(model_name, prompt); returns (text, stats) with the latency and token counts.
+    """
+    reset_usage()
+    started_at = time.perf_counter()
+    text = generate_fn(model_name, prompt)
+    return text, {"seconds": round(time.perf_counter() - started_at, 3), **last_usage()}
+
+# -------------------------------
+# Recording
+# -------------------------------
+def record_call(usage_log, label, model_name, encoding, prompt, stats, cache_hit):
+    """
+    Prints one model call and appends it to usage_log (JSON lines; skipped when usage_log is None).
+    - A cache hit is recorded with no tokens so the log shows what each run really cost
+    - seconds is None for requests answered inside a batch job (no per-request latency)
+    """
+    entry = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "label": label,
+        "model": model_name,
+        "encoding": encoding,
+        "prompt_chars": len(prompt),
+        "prompt_tokens": None if cache_hit else stats.get("prompt_tokens"),
+        "output_tokens": None if cache_hit else stats.get("output_tokens"),
+        "seconds": 0.0 if cache_hit else stats.get("seconds"),
+        "cache_hit": cache_hit,
+    }
+    tokens = "cached" if cache_hit else f"{entry['prompt_tokens']} in / {entry['output_tokens']} out tokens"
+    seconds = "" if entry["seconds"] is None else f", {entry['seconds']:.2f}s"
+    print(f"⏱️ LLM call ({encoding} prompt, {entry['prompt_chars']} chars): {tokens}{seconds}")
+    if usage_log:
+        os.makedirs(os.path.dirname(os.path.abspath(usage_log)), exist_ok=True)
+        with _log_lock, open(usage_log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
+
+def load_calls(usage_logs):
+    calls = []
+    for usage_log in usage_logs:
+        with open(usage_log, "r", encoding="utf-8") as f:
+            calls.extend(json.loads(line) for line in f if line.strip())
+    return calls
+
+def summarize(calls):
+    """
+    Totals per (label, encoding): calls, cache hits, prompt/output tokens and model seconds.
+    """
+    totals = {}
+    for call in calls:
+        row = totals.setdefault((call["label"], call["encoding"]), {
+            "calls": 0, "cache_hits": 0, "prompt_chars": 0, "prompt_tokens": 0, "output_tokens": 0, "seconds": 0.0})
+        row["calls"] += 1
+        row["cache_hits"] += bool(call["cache_hit"])
+        row["prompt_chars"] += call["prompt_chars"]
+        row["prompt_tokens"] += call["prompt_tokens"] or 0
+        row["output_tokens"] += call["output_tokens"] or 0
+        row["seconds"] += call["seconds"] or 0.0
+    return totals
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Summarize LLM token usage and latency per song.")
+    parser.add_argument("usage_logs", nargs="+", help="llm_usage.jsonl files (e.g. output/*/llm_usage.jsonl).")
+    args = parser.parse_args()
+
+    totals = summarize(load_calls(args.usage_logs))
+    print(f"{'song':<30} {'encoding':<8} {'calls':>5} {'hits':>5} {'prompt tok':>10} {'output tok':>10} {'seconds':>8}")
+    for (label, encoding), row in sorted(totals.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        print(f"{str(label):<30} {encoding:<8} {row['calls']:>5} {row['cache_hits']:>5} "
+              f"{row['prompt_tokens']:>10} {row['output_tokens']:>10} {row['seconds']:>8.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+import pytz
+
+from Utilities.file_lock import file_lock
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LEDGER_FILE = os.path.join(SCRIPT_DIR, '..', 'cache', 'quota_ledger.json')
+
+# YouTube Data API v3 defaults: 10,000 units per project per day, reset at midnight Pacific time.
+DAILY_QUOTA = 10000
+QUOTA_TIMEZONE = pytz.timezone("America/Los_Angeles")
+
+# Cost in quota units of each endpoint we call.
+API_COSTS = {
+    "videos.insert": 1600,
+    "videos.update": 50,
+    "videos.list": 1,
+    "captions.insert": 400,
+    "captions.list": 50,
+    "captions.download": 200,
+}
+
+# -------------------------------
+# Ledger
+# -------------------------------
+def current_window():
+    """
+    The quota window (a Pacific-time date) we are in right now.
+    """
+    return datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+@contextmanager
+def ledger_lock(ledger_file=DEFAULT_LEDGER_FILE):
+    """
+    Exclusive lock on <ledger_file>.lock, held across load-update-save so parallel runs do not lose charges.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(ledger_file)), exist_ok=True)
+    with file_lock(f"{ledger_file}.lock"):
+        yield
+
+def load_ledger(ledger_file=DEFAULT_LEDGER_FILE):
+    """
+    Reads the persistent ledger; a ledger from an earlier window starts over at zero.
+    """
+    window = current_window()
+    if os.path.exists(ledger_file):
+        try:
+            with open(ledger_file, "r", encoding="utf-8") as f:
+                ledger = json.load(f)
+            if ledger.get("window") == window:
+                return ledger
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Ignoring unreadable quota ledger {ledger_file}: {e}")
+    return {"window": window, "used": 0, "calls": {}}
+
+def save_ledger(ledger, ledger_file=DEFAULT_LEDGER_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(ledger_file)), exist_ok=True)
+    tmp_file = f"{ledger_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(ledger, f, indent=2)
+    os.replace(tmp_file, ledger_file)
+
+def record_api_call(endpoint, count=1, ledger_file=DEFAULT_LEDGER_FILE):
+    """
+    Charges `count` calls of `endpoint` to today's ledger.
+    """
+    with ledger_lock(ledger_file):
+        ledger = load_ledger(ledger_file)
+        ledger["used"] += API_COSTS[endpoint] * count
+        ledger["calls"][endpoint] = ledger["calls"].get(endpoint, 0) + count
+        save_ledger(ledger, ledger_file)
+
+def mark_quota_exhausted(ledger_file=DEFAULT_LEDGER_FILE):
+    """
+    Called when the API answers quotaExceeded: nothing more is admitted until the window resets.
+    """
+    with ledger_lock(ledger_file):
+        ledger = load_ledger(ledger_file)
+        ledger["used"] = max(ledger["used"], DAILY_QUOTA)
+        save_ledger(ledger, ledger_file)
+
+def is_quota_exceeded_error(error):
+    return getattr(getattr(error, "resp", None), "status", None) == 403 and "quotaExceeded" in str(error)
+
+def remaining_quota(ledger_file=DEFAULT_LEDGER_FILE, daily_quota=DAILY_QUOTA):
+    return max(0, daily_quota - load_ledger(ledger_file)["used"])
+
+# -------------------------------
+# Scheduler
+# -------------------------------
+def calls_cost(endpoints):
+    return sum(API_COSTS[endpoint] for endpoint in endpoints)
+
+def admit_jobs(jobs, ledger_file=DEFAULT_LEDGER_FILE, daily_quota=DAILY_QUOTA):
+    """
+    Chooses the jobs that fit in what is left of today's quota.
+    - jobs: dicts with "name", "cost" and optional "priority" (earlier sorts first, None last)
+    - A job is admitted only if its whole cost fits, so no song stops halfway through
+    - Returns (admitted, deferred) lists of job dicts, in priority order
+    """
+    remaining = remaining_quota(ledger_file, daily_quota)
+    admitted, deferred = [], []
+    for job in sorted(jobs, key=lambda j: (j.get("priority") is None, j.get("priority") or "")):
+        if job["cost"] <= remaining:
+            admitted.append(job)
+            remaining -= job["cost"]
+        else:
+            deferred.append(job)
+    return admitted, deferred
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Show the YouTube Data API quota ledger.")
+    parser.add_argument("--ledger_file", default=DEFAULT_LEDGER_FILE, help="Ledger location (default: source_files/cache/quota_ledger.json).")
+    args = parser.parse_args()
+
+    ledger = load_ledger(args.ledger_file)
+    print(f"Window (Pacific date): {ledger['window']}")
+    print(f"Used: {ledger['used']} / {DAILY_QUOTA} units, remaining {max(0, DAILY_QUOTA - ledger['used'])}")
+    for endpoint, count in sorted(ledger["calls"].items()):
+        print(f"  {endpoint:<18} {count:>5} calls  {count * API_COSTS[endpoint]:>6} units")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+
+from Utilities.file_cache import FileCache, remove_if_exists, run_cache_command
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(SCRIPT_DIR, '..', 'cache', 'render')
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3  # 5 GB
+
+# -------------------------------
+# Keys
+# -------------------------------
+def hash_file(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def render_key(input_paths, params):
+    """
+    Content address of a render: the bytes of every input plus the render parameters.
+    """
+    digest = hashlib.sha256()
+    for path in input_paths:
+        digest.update(hash_file(path).encode("ascii"))
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+def unlink_output(path):
+    """
+    Removes a previous output before anything rewrites it.
+    - A cache hit leaves the output hard-linked to its cache entry; ffmpeg -y, PIL save and
+      open("wb") truncate that shared inode, so every writer of a cached output calls this first
+    """
+    remove_if_exists(path)
+
+def link_or_copy(source, destination):
+    """
+    Hard-links source to destination, falling back to a copy across filesystems.
+    - Writers of the destination must unlink_output() it first (the link shares the cache entry)
+    """
+    unlink_output(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+# -------------------------------
+# Cache
+# -------------------------------
+class RenderCache(FileCache):
+    """
+    Content-addressed store of rendered files with size-bounded LRU eviction (see FileCache).
+    - Each entry is <key><ext> plus a <key>.json sidecar with its parameters
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    def _entry_path(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    def entry_key(self, name):
+        key, ext = os.path.splitext(name)
+        return None if ext in (".json", ".tmp") else key
+
+    def entry_files(self, entry):
+        return [entry["path"], self._entry_path(entry["key"], ".json")]
+
+    def fetch(self, key, output_path):
+        """
+        Serves a cached render to output_path. Returns True on a hit.
+        """
+        entry = self._entry_path(key, os.path.splitext(output_path)[1])
+        if not self.touch(entry):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        try:
+            link_or_copy(entry, output_path)
+        except FileNotFoundError:
+            # Evicted by another process right after the touch
+            return False
+        return True
+
+    def store(self, key, produced_path, params=None):
+        """
+        Adds a freshly rendered file to the cache and evicts old entries if needed.
+        """
+        entry = self._entry_path(key, os.path.splitext(produced_path)[1])
+        tmp_entry = f"{entry}.{os.getpid()}.tmp"
+        shutil.copy2(produced_path, tmp_entry)
+        os.replace(tmp_entry, entry)
+        with open(self._entry_path(key, ".json"), "w", encoding="utf-8") as f:
+            json.dump({"source": os.path.basename(produced_path), "params": params or {}}, f)
+        self.prune()
+
+def cached_render(input_paths, params, output_path, render_fn, cache=None):
+    """
+    Runs render_fn() only when no render of the same inputs and params is cached.
+    - render_fn must write output_path and return a truthy value on success
+    - Returns render_fn's result, or {"cache_hit": True} on a hit
+    """
+    cache = cache or RenderCache()
+    key = render_key(input_paths, params)
+    if cache.fetch(key, output_path):
+        print(f"⚡ Render cache hit: {output_path}")
+        return {"cache_hit": True}
+
+    # A previous hit may have left output_path hard-linked to a cache entry
+    unlink_output(output_path)
+    result = render_fn()
+    if result and os.path.exists(output_path):
+        cache.store(key, output_path, params)
+    return result
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and prune the render cache.")
+    parser.add_argument("command", choices=["stats", "prune", "clear"], help="stats: show usage; prune: evict LRU entries; clear: remove everything.")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Cache directory (default: source_files/cache/render).")
+    parser.add_argument("--max_bytes", type=int, default=DEFAULT_MAX_BYTES, help="Size bound used by prune (default: 5 GB).")
+    args = parser.parse_args()
+
+    return run_cache_command(RenderCache(args.cache_dir, args.max_bytes), args.command)
+
+if __name__ == "__main__":
+    sys.exit(main())
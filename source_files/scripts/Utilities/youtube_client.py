@@ -0,0 +1,77 @@
+import os
+import json
+import threading
+import httplib2
+import google_auth_httplib2
+from googleapiclient.discovery import build_from_document
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DISCOVERY_CACHE_DIR = os.path.join(SCRIPT_DIR, '..', 'cache', 'discovery')
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+HTTP_TIMEOUT_SECONDS = 120
+
+_discovery_documents = {}
+_discovery_lock = threading.Lock()
+_thread_clients = threading.local()
+
+# -------------------------------
+# Discovery document
+# -------------------------------
+def load_discovery_document(api="youtube", version="v3"):
+    """
+    Returns the API's discovery document, parsed once per process.
+    - Prefers the copy bundled with google-api-python-client
+    - Falls back to a copy cached under source_files/cache/discovery, fetched once
+    """
+    key = (api, version)
+    with _discovery_lock:
+        if key in _discovery_documents:
+            return _discovery_documents[key]
+
+        document = None
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            document = get_static_doc(api, version)
+        except ImportError:
+            pass
+
+        cache_file = os.path.join(DISCOVERY_CACHE_DIR, f"{api}.{version}.json")
+        if document is None and os.path.exists(cache_file):
+            with open(cache_file, "r", encoding="utf-8") as f:
+                document = f.read()
+        if document is None:
+            response, content = httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS).request(DISCOVERY_URL.format(api=api, version=version))
+            if response.status != 200:
+                raise RuntimeError(f"Could not fetch the {api} {version} discovery document: HTTP {response.status}")
+            document = content.decode("utf-8")
+            os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+            with open(cache_file, "w", encoding="utf-8") as f:
+                f.write(document)
+
+        _discovery_documents[key] = json.loads(document)
+        return _discovery_documents[key]
+
+# -------------------------------
+# Client factory
+# -------------------------------
+def get_youtube_client(creds=None):
+    """
+    Returns this thread's YouTube client for `creds` (default credentials when None).
+    - httplib2 is not thread-safe, so every thread gets its own client and connection pool
+    - A thread reuses its client, so keep-alive connections survive across API calls
+    """
+    if creds is None:
+        from Utilities.get_credentials import get_default_credentials
+        creds = get_default_credentials()
+
+    clients = getattr(_thread_clients, "clients", None)
+    if clients is None:
+        clients = _thread_clients.clients = []
+    for cached_creds, client in clients:
+        if cached_creds is creds:
+            return client
+
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS))
+    client = build_from_document(load_discovery_document("youtube", "v3"), http=http)
+    clients.append((creds, client))
+    return client
@@ -1,24 +1,17 @@
 import os
 import json
 import argparse
-import google.auth.exceptions
 
 
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
 
-from Utilities.get_credentials import get_credentials
+from Utilities.youtube_client import get_youtube_client
+from Utilities.quota_scheduler import record_api_call, mark_quota_exhausted, is_quota_exceeded_error
 
+# Assume you've already set up OAuth2 credentials with youtube.upload scope.
+# They are loaded on the first API call (get_youtube_client() with no creds), not at import.
 
-# Assume you've already set up OAuth2 credentials with youtube.upload scope
-default_creds = get_credentials()
-default_youtube = build("youtube", "v3", credentials=default_creds)
-
-def set_video_privacy_status(video_id, privacy_status="public", publish_time=None, youtube=default_youtube):
+def set_video_privacy_status(video_id, privacy_status="public", publish_time=None, youtube=None):
     """
     Change the privacy status of a YouTube video.
     
@@ -27,6 +20,7 @@ def set_video_privacy_status(video_id, privacy_status="public", publish_time=Non
     :param publish_time: Optional ISO 8601 datetime string (e.g. '2025-11-25T15:00:00Z')
                          Only used when privacy_status='private' to schedule publishing.
     """
+    youtube = youtube or get_youtube_client()
     try:
         status_body = {"privacyStatus": privacy_status}
         
@@ -41,6 +35,7 @@ def set_video_privacy_status(video_id, privacy_status="public", publish_time=Non
                 "status": status_body
             }
         )
+        record_api_call("videos.update")
         response = request.execute()
         print(f"Video {video_id} updated: privacy={privacy_status}, publishAt={publish_time}")
         return response
@@ -51,12 +46,14 @@ def set_video_privacy_status(video_id, privacy_status="public", publish_time=Non
 
 
 
-def get_video_privacy_status(video_id, youtube=default_youtube):
+def get_video_privacy_status(video_id, youtube=None):
+    youtube = youtube or get_youtube_client()
     try:
         request = youtube.videos().list(
             part="status",
             id=video_id
         )
+        record_api_call("videos.list")
         response = request.execute()
         if "items" in response and len(response["items"]) > 0:
             privacy_status = response["items"][0]["status"]["privacyStatus"]
@@ -70,7 +67,7 @@ def get_video_privacy_status(video_id, youtube=default_youtube):
         return None
 
 
-def set_video_language(video_id, youtube= default_youtube, language_code="te", LanguageSettingType="defaultAudioLanguage"):
+def set_video_language(video_id, youtube=None, language_code="te", LanguageSettingType="defaultAudioLanguage"):
     """
     Set the default language of a YouTube video.
     
@@ -78,8 +75,10 @@ def set_video_language(video_id, youtube= default_youtube, language_code="te", L
     :param language_code: The language code to set (e.g., 'te' for Telugu)
     :param LanguageSettingType: The type of language setting ('defaultAudioLanguage' or 'defaultLanguage')
     """
+    youtube = youtube or get_youtube_client()
     try:
         # Retrieve the current snippet
+        record_api_call("videos.list")
         video_response = youtube.videos().list(
             part="snippet",
             id=video_id
@@ -95,6 +94,7 @@ def set_video_language(video_id, youtube= default_youtube, language_code="te", L
         snippet[LanguageSettingType] = language_code
 
         # Update the video with the new snippet
+        record_api_call("videos.update")
         update_response = youtube.videos().update(
             part="snippet",
             body={
@@ -111,12 +111,14 @@ def set_video_language(video_id, youtube= default_youtube, language_code="te", L
     except Exception as e:
         print(f"Unexpected error: {e}")
 
-def get_video_language(video_id, youtube=default_youtube, LanguageSettingType="defaultAudioLanguage"):
+def get_video_language(video_id, youtube=None, LanguageSettingType="defaultAudioLanguage"):
+    youtube = youtube or get_youtube_client()
     try:
         request = youtube.videos().list(
             part="snippet",
             id=video_id
         )
+        record_api_call("videos.list")
         response = request.execute()
         if "items" in response and len(response["items"]) > 0:
             snippet = response["items"][0]["snippet"]
@@ -132,12 +134,141 @@ def get_video_language(video_id, youtube=default_youtube, LanguageSettingType="d
     
 
 
-def upload_subtitles(video_id, srt_file, language="en", name="English Subtitles", creds=default_creds):
+# -------------------------------
+# Bulk operations (whole catalog)
+# -------------------------------
+# videos.list takes up to 50 comma-separated IDs for the cost of one call;
+# a batch HTTP request carries up to 50 updates in one round trip (each update is still charged).
+VIDEOS_LIST_MAX_IDS = 50
+BATCH_MAX_REQUESTS = 50
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def list_videos(video_ids, part="status", youtube=None):
+    """
+    Fetches many videos with one videos.list call per 50 IDs.
+    - Returns (items, errors): {video_id: video resource} and {video_id: error message}
+    """
+    youtube = youtube or get_youtube_client()
+    items, errors = {}, {}
+    for chunk in chunked(list(dict.fromkeys(video_ids)), VIDEOS_LIST_MAX_IDS):
+        try:
+            record_api_call("videos.list")
+            # maxResults is not supported with the id filter; the 50-id chunk bounds the page
+            response = youtube.videos().list(part=part, id=",".join(chunk)).execute()
+        except HttpError as e:
+            if is_quota_exceeded_error(e):
+                mark_quota_exhausted()
+            for video_id in chunk:
+                errors[video_id] = f"HTTP {e.resp.status}: {e}"
+            continue
+        for item in response.get("items", []):
+            items[item["id"]] = item
+        for video_id in chunk:
+            if video_id not in items:
+                errors[video_id] = "No video found with that ID."
+    return items, errors
+
+def execute_batch_updates(updates, youtube=None):
+    """
+    Sends videos.update requests in batches of 50.
+    - updates: {video_id: (part, body)}
+    - Returns (results, errors): {video_id: updated resource} and {video_id: error message}
+    """
+    youtube = youtube or get_youtube_client()
+    results, errors = {}, {}
+
+    def callback(video_id, response, exception):
+        if exception is None:
+            results[video_id] = response
+            return
+        if is_quota_exceeded_error(exception):
+            mark_quota_exhausted()
+        status = getattr(getattr(exception, "resp", None), "status", None)
+        errors[video_id] = f"HTTP {status}: {exception}" if status else str(exception)
+
+    for chunk in chunked(list(updates.items()), BATCH_MAX_REQUESTS):
+        batch = youtube.new_batch_http_request(callback=callback)
+        for video_id, (part, body) in chunk:
+            batch.add(youtube.videos().update(part=part, body=body), request_id=video_id)
+        record_api_call("videos.update", count=len(chunk))
+        try:
+            batch.execute()
+        except Exception as e:
+            # The whole round trip failed; every update in it that has no answer failed with it
+            for video_id, _ in chunk:
+                if video_id not in results and video_id not in errors:
+                    errors[video_id] = f"Batch request failed: {e}"
+    return results, errors
+
+def report_bulk(action, results, errors):
+    print(f"{action}: {len(results)} ok, {len(errors)} failed")
+    for video_id, error in errors.items():
+        print(f"  ❌ {video_id}: {error}")
+
+def get_videos_privacy_status(video_ids, youtube=None):
+    """
+    Bulk get_video_privacy_status. Returns ({video_id: privacyStatus}, {video_id: error}).
+    """
+    items, errors = list_videos(video_ids, part="status", youtube=youtube)
+    statuses = {video_id: item["status"]["privacyStatus"] for video_id, item in items.items()}
+    report_bulk("Privacy status", statuses, errors)
+    return statuses, errors
+
+def set_videos_privacy_status(video_ids, privacy_status="public", publish_time=None, youtube=None):
+    """
+    Bulk set_video_privacy_status.
+    - publish_time: one ISO 8601 time for all videos, or {video_id: time} to re-schedule each one
+    - Returns ({video_id: updated resource}, {video_id: error})
+    """
+    updates = {}
+    for video_id in dict.fromkeys(video_ids):
+        status_body = {"privacyStatus": privacy_status}
+        video_publish_time = publish_time.get(video_id) if isinstance(publish_time, dict) else publish_time
+        if privacy_status == "private" and video_publish_time:
+            status_body["publishAt"] = video_publish_time
+        updates[video_id] = ("status", {"id": video_id, "status": status_body})
+    results, errors = execute_batch_updates(updates, youtube=youtube)
+    report_bulk(f"Set privacy={privacy_status}", results, errors)
+    return results, errors
+
+def get_videos_language(video_ids, youtube=None, LanguageSettingType="defaultAudioLanguage"):
+    """
+    Bulk get_video_language. Returns ({video_id: language code or None}, {video_id: error}).
+    """
+    items, errors = list_videos(video_ids, part="snippet", youtube=youtube)
+    languages = {video_id: item["snippet"].get(LanguageSettingType) for video_id, item in items.items()}
+    report_bulk(LanguageSettingType, languages, errors)
+    return languages, errors
+
+def set_videos_language(video_ids, youtube=None, language_code="te", LanguageSettingType="defaultAudioLanguage"):
+    """
+    Bulk set_video_language: one videos.list per 50 IDs for the current snippets, then batched updates.
+    Returns ({video_id: updated resource}, {video_id: error}).
+    """
+    youtube = youtube or get_youtube_client()
+    items, errors = list_videos(video_ids, part="snippet", youtube=youtube)
+    updates = {}
+    for video_id, item in items.items():
+        snippet = item["snippet"]
+        snippet[LanguageSettingType] = language_code
+        updates[video_id] = ("snippet", {"id": video_id, "snippet": snippet})
+    results, update_errors = execute_batch_updates(updates, youtube=youtube)
+    errors.update(update_errors)
+    report_bulk(f"Set {LanguageSettingType}={language_code}", results, errors)
+    return results, errors
+
+
+def upload_subtitles(video_id, srt_file, language="en", name="English Subtitles", creds=None):
     """
     Upload an SRT subtitle file to YouTube for a given video ID.
+    Returns the captions.insert response, or None when the upload failed.
     """
+    from googleapiclient.http import MediaFileUpload
+
     #creds = get_credentials()
-    youtube = build("youtube", "v3", credentials=creds)
+    youtube = get_youtube_client(creds)
 
     # Prepare metadata for the caption track
     body = {
@@ -160,13 +291,18 @@ def upload_subtitles(video_id, srt_file, language="en", name="English Subtitles"
             body=body,
             media_body=media
         )
+        record_api_call("captions.insert")
         response = request.execute()
         print("Uploaded subtitles:", response)
+        return response
 
     except HttpError as e:
         # API-specific errors
         print(f"HTTP error {e.resp.status}: {e.error_details if hasattr(e, 'error_details') else e}")
-        if e.resp.status == 403:
+        if is_quota_exceeded_error(e):
+            mark_quota_exhausted()
+            print("Daily API quota exhausted; remaining work waits for the next quota window.")
+        elif e.resp.status == 403:
             print("Check your API quota or OAuth scopes.")
         elif e.resp.status == 404:
             print("Video not found or you lack permission.")
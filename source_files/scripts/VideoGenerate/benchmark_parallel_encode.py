@@ -0,0 +1,67 @@
+import os
+import argparse
+import tempfile
+
+from VideoGenerate.video_generate import (
+    DEFAULT_FPS, get_ffmpeg_binary, run_ffmpeg, create_moviepy_video, create_still_video, create_parallel_still_video,
+    default_encode_workers
+)
+
+# -------------------------------
+# Synthetic inputs
+# -------------------------------
+def make_test_image(path):
+    run_ffmpeg([get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", "testsrc2=size=1280x720", "-frames:v", "1", path])
+
+def make_test_audio(path, minutes):
+    run_ffmpeg([get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100", "-t", str(minutes * 60),
+                "-c:a", "aac", "-b:a", "128k", path])
+
+# -------------------------------
+# Benchmark
+# -------------------------------
+def run_benchmark(minutes_list=(10, 30, 60), fps=1, workers=None, moviepy=True):
+    """
+    Encodes synthetic 10/30/60-minute inputs with the original single moviepy pipeline (24 fps),
+    the still-image engine and the parallel engine, and prints the speedups over moviepy.
+    - moviepy=False skips the (slow) baseline; speedups are then relative to the still engine
+    """
+    workers = workers or default_encode_workers()
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="encode_benchmark_") as work_dir:
+        image_path = os.path.join(work_dir, "image.png")
+        make_test_image(image_path)
+        for minutes in minutes_list:
+            audio_path = os.path.join(work_dir, f"audio_{minutes}.m4a")
+            make_test_audio(audio_path, minutes)
+            baseline = None
+            if moviepy:
+                baseline = create_moviepy_video(image_path, audio_path, os.path.join(work_dir, f"moviepy_{minutes}.mp4"),
+                                                extra_seconds=0, fps=DEFAULT_FPS["moviepy"])["encode_seconds"]
+            still = create_still_video(image_path, audio_path, os.path.join(work_dir, f"still_{minutes}.mp4"), extra_seconds=0, fps=fps)
+            parallel = create_parallel_still_video(image_path, audio_path, os.path.join(work_dir, f"parallel_{minutes}.mp4"),
+                                                   extra_seconds=0, fps=fps, workers=workers)
+            rows.append((minutes, baseline, still["encode_seconds"], parallel["encode_seconds"]))
+
+    print(f"\nmoviepy at {DEFAULT_FPS['moviepy']} fps; still/parallel at fps={fps}, workers={workers}")
+    print(f"{'minutes':>7}  {'moviepy (s)':>11}  {'still (s)':>9}  {'parallel (s)':>12}  {'still x':>7}  {'parallel x':>10}")
+    for minutes, baseline_seconds, still_seconds, parallel_seconds in rows:
+        reference = baseline_seconds if baseline_seconds is not None else still_seconds
+        baseline_text = f"{baseline_seconds:>11.1f}" if baseline_seconds is not None else f"{'-':>11}"
+        print(f"{minutes:>7}  {baseline_text}  {still_seconds:>9.1f}  {parallel_seconds:>12.1f}  "
+              f"{reference / still_seconds:>6.2f}x  {reference / parallel_seconds:>9.2f}x")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the moviepy pipeline with the still-image and parallel chunked encoders.")
+    parser.add_argument("--minutes", type=int, nargs="+", default=[10, 30, 60], help="Synthetic track lengths in minutes (default: 10 30 60).")
+    parser.add_argument("--fps", type=int, default=1, help="Output frame rate (default: 1).")
+    parser.add_argument("--workers", type=int, help="Parallel worker processes (default: CPU count).")
+    parser.add_argument("--no_moviepy", action="store_true", help="Skip the moviepy baseline (it renders every frame at 24 fps).")
+    args = parser.parse_args()
+    run_benchmark(args.minutes, args.fps, args.workers, moviepy=not args.no_moviepy)
+
+if __name__ == "__main__":
+    main()
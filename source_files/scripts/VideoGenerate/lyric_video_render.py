@@ -0,0 +1,154 @@
+import os
+import time
+import argparse
+import tempfile
+from PIL import Image, ImageDraw, ImageFont
+
+from ImageProcesser.image_resize import prepare_youtube_frame
+from SubtitleHandler.subtitle_track import SubtitleTrack
+from VideoGenerate.video_generate import probe_duration, encode_still_segment, concat_segments, report_encode_stats
+
+# Fonts that cover IAST diacritics, tried in order before Pillow's bitmap default.
+DEFAULT_FONT_CANDIDATES = ["DejaVuSans.ttf", "arial.ttf", "NotoSans-Regular.ttf"]
+
+# -------------------------------
+# Cues
+# -------------------------------
+def parse_srt_cues(srt_file):
+    """
+    Reads an SRT file into (start_seconds, end_seconds, text) tuples, sorted by start.
+    Index lines repeated inside a cue (as in our regenerated files) are dropped.
+    """
+    return SubtitleTrack.read(srt_file).sorted().to_seconds()
+
+def build_timeline(cues, total_seconds):
+    """
+    Splits [0, total_seconds) into constant pieces: (start, end, text or None for the bare image).
+    Overlapping cues are cut where the next one starts.
+    """
+    track = SubtitleTrack.from_seconds(cues).resolve_overlaps().clip(0, round(total_seconds * 1000))
+    timeline = []
+    position = 0.0
+    for start, end, text in track.to_seconds():
+        if start > position:
+            timeline.append((position, start, None))
+        timeline.append((start, end, text))
+        position = end
+    if position < total_seconds:
+        timeline.append((position, total_seconds, None))
+    return timeline
+
+# -------------------------------
+# Frames
+# -------------------------------
+def load_font(font_path=None, size=40):
+    for candidate in ([font_path] if font_path else []) + DEFAULT_FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+def wrap_text(draw, text, font, max_width):
+    wrapped = []
+    for paragraph in text.splitlines():
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}".strip()
+            if line and draw.textlength(candidate, font=font) > max_width:
+                wrapped.append(line)
+                line = word
+            else:
+                line = candidate
+        wrapped.append(line)
+    return wrapped
+
+def render_cue_frame(base_image, text, font, output_path):
+    """
+    Draws the cue text centred near the bottom of the picture on a translucent band.
+    """
+    frame = base_image.copy().convert("RGBA")
+    overlay = Image.new("RGBA", frame.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+
+    margin = frame.width // 20
+    lines = wrap_text(draw, text, font, frame.width - 2 * margin)
+    line_height = int(font.size * 1.3) if hasattr(font, "size") else 16
+    band_height = line_height * len(lines) + margin // 2
+    band_top = frame.height - band_height - margin // 2
+    draw.rectangle([0, band_top, frame.width, band_top + band_height], fill=(0, 0, 0, 150))
+
+    y = band_top + margin // 4
+    for line in lines:
+        x = (frame.width - draw.textlength(line, font=font)) / 2
+        draw.text((x, y), line, font=font, fill=(255, 255, 255, 255))
+        y += line_height
+
+    Image.alpha_composite(frame, overlay).convert("RGB").save(output_path, format="PNG")
+
+# -------------------------------
+# Renderer
+# -------------------------------
+def create_lyric_video(image_path, audio_path, srt_file, output_path, extra_seconds=2, fps=10, font_path=None, font_size=40):
+    """
+    Burns subtitles into a still-image video with cost proportional to the number of cues.
+    - image_path is a file path or an in-memory PIL frame
+    - One frame is rasterized per distinct cue text (the bare image is shared by all gaps)
+    - Each constant piece is encoded as its own segment with the still-image settings
+    - Segments are concatenated without re-encoding and the audio is muxed once
+    - Returns encode time and realtime factor
+    """
+    start_time = time.perf_counter()
+    total_seconds = probe_duration(audio_path) + extra_seconds
+    timeline = build_timeline(parse_srt_cues(srt_file), total_seconds)
+    base_image = (Image.open(image_path) if isinstance(image_path, str) else image_path).convert("RGB")
+    font = load_font(font_path, font_size)
+
+    with tempfile.TemporaryDirectory(prefix="lyric_video_") as work_dir:
+        frames = {None: os.path.join(work_dir, "frame_plain.png")}
+        base_image.save(frames[None], format="PNG")
+
+        segment_paths = []
+        for index, (start, end, text) in enumerate(timeline):
+            if text not in frames:
+                frames[text] = os.path.join(work_dir, f"frame_{len(frames):04d}.png")
+                render_cue_frame(base_image, text, font, frames[text])
+            # Frame counts come from the absolute timeline so rounding never drifts
+            frame_count = round(end * fps) - round(start * fps)
+            if frame_count <= 0:
+                continue
+            segment_path = os.path.join(work_dir, f"segment_{index:04d}.mp4")
+            encode_still_segment(frames[text], segment_path, frame_count, fps)
+            segment_paths.append(segment_path)
+
+        print(f"Rendered {len(frames)} frames into {len(segment_paths)} segments")
+        concat_segments(segment_paths, output_path, audio_path=audio_path, duration=total_seconds)
+
+    return report_encode_stats(output_path, time.perf_counter() - start_time, total_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a lyric video with burned-in subtitles.")
+    parser.add_argument("song_name", help="Name of the song to identify each project for data and output.")
+    parser.add_argument("--image_name", default="image.png", help="Picture in data/<song>, resized in memory (default: image.png).")
+    parser.add_argument("--audio_name", default="audio.mp3", help="Audio file in data/<song> (default: audio.mp3).")
+    parser.add_argument("--srt_name", help="Subtitle file in output/<song> (default: <song>_regenerated_en_captions.srt).")
+    parser.add_argument("--fps", type=int, default=10, help="Frame rate; cue timing precision is 1/fps seconds (default: 10).")
+    parser.add_argument("--font", help="Path to a TrueType font covering the subtitle script.")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(base_dir, '..', '..', 'data', args.song_name)
+    output_dir = os.path.join(base_dir, '..', '..', 'output', args.song_name)
+    srt_name = args.srt_name or f"{args.song_name}_regenerated_en_captions.srt"
+
+    create_lyric_video(
+        image_path=prepare_youtube_frame(os.path.join(data_dir, args.image_name)),
+        audio_path=os.path.join(data_dir, args.audio_name),
+        srt_file=os.path.join(output_dir, srt_name),
+        output_path=os.path.join(output_dir, f"{args.song_name}_lyrics.mp4"),
+        fps=args.fps,
+        font_path=args.font
+    )
+
+if __name__ == "__main__":
+    main()
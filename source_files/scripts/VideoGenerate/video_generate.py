@@ -1,37 +1,306 @@
 import os
+import re
+import time
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 #from moviepy import editor
-from moviepy.editor import ImageClip, AudioFileClip
 
-def create_video(image_path, audio_path, output_path, extra_seconds=2):
+# Audio containers whose stream can be copied straight into an MP4 without re-encoding.
+STREAM_COPY_AUDIO_EXTENSIONS = {".mp3", ".m4a", ".aac"}
+
+# x264 settings of the still-image engine (also part of the render cache key).
+STILL_VIDEO_CODEC_ARGS = ["-c:v", "libx264", "-tune", "stillimage", "-preset", "medium", "-pix_fmt", "yuv420p"]
+DEFAULT_FPS = {"still": 1, "moviepy": 24, "parallel": 1}
+# Parallel engine: chunks are whole GOPs of this many seconds, so every chunk starts on a keyframe.
+DEFAULT_GOP_SECONDS = 10
+
+# -------------------------------
+# ffmpeg helpers
+# -------------------------------
+def get_ffmpeg_binary():
+    """
+    Returns the ffmpeg binary moviepy is configured with (imageio-ffmpeg ships one),
+    so the still-image engine needs no extra install.
+    """
+    try:
+        from moviepy.config import get_setting
+        return get_setting("FFMPEG_BINARY")
+    except Exception:
+        return "ffmpeg"
+
+def probe_duration(media_path):
+    """
+    Returns the duration of a media file in seconds, parsed from ffmpeg's stream info.
+    """
+    result = subprocess.run(
+        [get_ffmpeg_binary(), "-hide_banner", "-i", media_path],
+        capture_output=True, text=True, encoding="utf-8", errors="replace"
+    )
+    match = re.search(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)", result.stderr)
+    if not match:
+        raise RuntimeError(f"Could not read duration of {media_path}")
+    hrs, mins, secs = match.groups()
+    return int(hrs) * 3600 + int(mins) * 60 + float(secs)
+
+def run_ffmpeg(command, input_bytes=None):
+    result = subprocess.run(command, input=input_bytes, capture_output=True)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace")
+        tail = "\n".join(stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {tail}")
+
+def still_image_input(image, fps):
+    """
+    ffmpeg input for a picture given either as a file path or as an in-memory PIL frame.
+    - A path is looped by the image demuxer
+    - A frame is piped once as raw RGB and repeated by the loop filter, so it is
+      never JPEG-encoded, written or decoded again
+    - Returns (input args, filter args, stdin bytes)
+    """
+    if isinstance(image, str):
+        return ["-loop", "1", "-framerate", str(fps), "-i", image], [], None
+    frame = image.convert("RGB")
+    input_args = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{frame.width}x{frame.height}",
+                  "-framerate", str(fps), "-i", "pipe:0"]
+    return input_args, ["-vf", "loop=loop=-1:size=1:start=0"], frame.tobytes()
+
+def audio_codec_args(audio_path):
+    """
+    Stream-copies MP3/AAC audio; anything else is encoded to AAC once.
+    """
+    if os.path.splitext(audio_path)[1].lower() in STREAM_COPY_AUDIO_EXTENSIONS:
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", "192k"]
+
+def report_encode_stats(output_path, encode_seconds, media_seconds):
+    realtime_factor = media_seconds / encode_seconds if encode_seconds > 0 else float("inf")
+    print(f"⏱️ Encoded {media_seconds:.1f}s of video in {encode_seconds:.1f}s ({realtime_factor:.1f}x realtime): {output_path}")
+    return {
+        "encode_seconds": encode_seconds,
+        "media_seconds": media_seconds,
+        "realtime_factor": realtime_factor
+    }
+
+# -------------------------------
+# Still-image engine (ffmpeg)
+# -------------------------------
+def create_still_video(image_path, audio_path, output_path, extra_seconds=2, fps=1):
+    """
+    Encodes a single still image against an audio track with ffmpeg directly.
+    - image_path may also be an in-memory PIL frame
+    - The picture is looped at a very low frame rate with x264's stillimage tuning
+    - MP3/AAC audio is stream-copied, anything else is encoded to AAC once
+    - Returns encode time and realtime factor
+    """
+    media_seconds = probe_duration(audio_path) + extra_seconds
+    command, image_bytes = still_video_command(image_path, audio_path, media_seconds, fps,
+                                               ["-movflags", "+faststart", output_path])
+
+    start = time.perf_counter()
+    run_ffmpeg(command, input_bytes=image_bytes)
+    return report_encode_stats(output_path, time.perf_counter() - start, media_seconds)
+
+def still_video_command(image_path, audio_path, media_seconds, fps, output_args):
+    """
+    ffmpeg command line of the still-image engine, ending in output_args.
+    Returns (command, stdin bytes for an in-memory frame or None).
+    """
+    image_args, filter_args, image_bytes = still_image_input(image_path, fps)
+    command = [
+        get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+        *image_args,
+        "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0",
+        *filter_args, *STILL_VIDEO_CODEC_ARGS, "-r", str(fps),
+        *audio_codec_args(audio_path),
+        "-t", f"{media_seconds:.3f}",
+        *output_args
+    ]
+    return command, image_bytes
+
+def open_still_video_stream(image_path, audio_path, extra_seconds=2, fps=1):
+    """
+    Starts the still-image encoder writing a fragmented (streamable) MP4 to its stdout.
+    - The moov box comes first and a fragment is cut every keyframe or 2 s, so bytes
+      can be uploaded as soon as they are produced
+    - Returns (process, media_seconds); read the video from process.stdout
+    """
+    media_seconds = probe_duration(audio_path) + extra_seconds
+    command, image_bytes = still_video_command(
+        image_path, audio_path, media_seconds, fps,
+        ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-frag_duration", "2000000", "-f", "mp4", "pipe:1"]
+    )
+    process = subprocess.Popen(command, stdin=subprocess.PIPE if image_bytes else subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if image_bytes:
+        # Feed the frame from a thread so a full stdout pipe can never deadlock us
+        def feed():
+            try:
+                process.stdin.write(image_bytes)
+            finally:
+                process.stdin.close()
+        threading.Thread(target=feed, daemon=True).start()
+    return process, media_seconds
+
+# -------------------------------
+# Segments (constant-picture pieces joined without re-encoding)
+# -------------------------------
+def encode_still_segment(image_path, output_path, frame_count, fps, gop=None, threads=None):
+    """
+    Encodes frame_count frames of one picture (path or PIL frame) as a video-only segment.
+    All segments share the same codec settings so they can be concatenated losslessly.
+    - gop fixes the keyframe interval (in frames) so chunk boundaries fall on GOP boundaries
+    - threads caps x264's threads when several segments encode at once
+    """
+    gop_args = ["-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0"] if gop else []
+    thread_args = ["-threads", str(threads)] if threads else []
+    image_args, filter_args, image_bytes = still_image_input(image_path, fps)
+    command = [
+        get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+        *image_args,
+        *filter_args, *STILL_VIDEO_CODEC_ARGS, *gop_args, *thread_args, "-r", str(fps),
+        "-frames:v", str(frame_count), "-an",
+        output_path
+    ]
+    run_ffmpeg(command, input_bytes=image_bytes)
+
+def concat_segments(segment_paths, output_path, audio_path=None, duration=None):
+    """
+    Joins segments with ffmpeg's concat demuxer (stream copy) and muxes the audio once.
+    """
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    command = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+               "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        command += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", *audio_codec_args(audio_path)]
+    command += ["-c:v", "copy"]
+    if duration:
+        command += ["-t", f"{duration:.3f}"]
+    command += ["-movflags", "+faststart", output_path]
+    try:
+        run_ffmpeg(command)
+    finally:
+        os.remove(list_path)
+
+# -------------------------------
+# Parallel engine (long-form audio)
+# -------------------------------
+def default_encode_workers():
+    return max(1, os.cpu_count() or 1)
+
+def plan_gop_chunks(total_frames, gop, workers):
+    """
+    Splits total_frames into at most `workers` chunks whose sizes are whole GOPs (except the last).
+    """
+    total_gops = -(-total_frames // gop)
+    gops_per_chunk = max(1, -(-total_gops // workers))
+    chunk_frames = gops_per_chunk * gop
+    return [min(chunk_frames, total_frames - start) for start in range(0, total_frames, chunk_frames)]
+
+def create_parallel_still_video(image_path, audio_path, output_path, extra_seconds=2, fps=1, workers=None,
+                                gop_seconds=DEFAULT_GOP_SECONDS):
+    """
+    Encodes a long still-image video as GOP-aligned chunks in parallel ffmpeg processes.
+    - Each worker encodes a run of whole GOPs with the still-image settings
+    - Chunks are joined with a lossless concat and the audio is muxed once at the end
+    - A track too short for two chunks (or with no frames at all) uses the single still encode
+    - Returns encode time and realtime factor
+    """
+    workers = workers or default_encode_workers()
+    media_seconds = probe_duration(audio_path) + extra_seconds
+    gop = max(1, int(round(gop_seconds * fps)))
+    chunks = plan_gop_chunks(int(round(media_seconds * fps)), gop, workers)
+    if len(chunks) < 2:
+        return create_still_video(image_path, audio_path, output_path, extra_seconds=extra_seconds, fps=fps)
+    threads_per_chunk = max(1, default_encode_workers() // len(chunks))
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="parallel_encode_") as work_dir:
+        chunk_paths = [os.path.join(work_dir, f"chunk_{index:04d}.mp4") for index in range(len(chunks))]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # The heavy lifting happens in the ffmpeg child processes; threads only wait on them
+            futures = [
+                pool.submit(encode_still_segment, image_path, chunk_path, frame_count, fps, gop, threads_per_chunk)
+                for chunk_path, frame_count in zip(chunk_paths, chunks)
+            ]
+            for future in futures:
+                future.result()
+        concat_segments(chunk_paths, output_path, audio_path=audio_path, duration=media_seconds)
+    print(f"Encoded {len(chunks)} chunks with {workers} workers")
+    return report_encode_stats(output_path, time.perf_counter() - start, media_seconds)
+
+# -------------------------------
+# moviepy engine
+# -------------------------------
+def create_moviepy_video(image_path, audio_path, output_path, extra_seconds=2, fps=24):
+    """
+    Renders every frame through moviepy and re-encodes the audio.
+    """
+    # moviepy and numpy take seconds to import; only this engine needs them
+    import numpy
+    from moviepy.editor import ImageClip, AudioFileClip
+
+    # Load audio
+    try:
+        audio_clip = AudioFileClip(audio_path)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load audio: {e}")
+
+    # Load image and set duration (ImageClip also takes an array, for in-memory frames)
+    try:
+        image_source = image_path if isinstance(image_path, str) else numpy.asarray(image_path.convert("RGB"))
+        image_clip = ImageClip(image_source).set_duration(audio_clip.duration + extra_seconds)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load image: {e}")
+
+    # Combine image and audio
+    video_clip = image_clip.set_audio(audio_clip)
+
+    # Export video
+    start = time.perf_counter()
+    try:
+        video_clip.write_videofile(output_path, fps=fps)
+    except Exception as e:
+        raise RuntimeError(f"Failed to write video: {e}")
+    return report_encode_stats(output_path, time.perf_counter() - start, video_clip.duration)
+
+VIDEO_ENGINES = {
+    "still": create_still_video,
+    "moviepy": create_moviepy_video,
+    "parallel": create_parallel_still_video,
+}
+
+def create_video(image_path, audio_path, output_path, extra_seconds=2, engine="still", fps=None, workers=None):
+    """
+    Creates a video from a still image and an audio file.
+    - image_path is a file path or an in-memory PIL frame (see prepare_youtube_frame)
+    - engine="still" (default) encodes the picture once with ffmpeg at 1 fps
+    - engine="parallel" splits long tracks into GOP-aligned chunks encoded by `workers` processes
+    - engine="moviepy" renders every frame at 24 fps
+    - Returns the encode stats, or None on failure
+    """
     try:
         # Check if files exist
-        if not os.path.exists(image_path):
+        if isinstance(image_path, str) and not os.path.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        if engine not in VIDEO_ENGINES:
+            raise ValueError(f"Unknown video engine '{engine}'. Choose from: {list(VIDEO_ENGINES)}")
 
-        # Load audio
-        try:
-            audio_clip = AudioFileClip(audio_path)
-        except Exception as e:
-            raise RuntimeError(f"Failed to load audio: {e}")
-
-        # Load image and set duration
-        try:
-            image_clip = ImageClip(image_path).set_duration(audio_clip.duration + extra_seconds)
-        except Exception as e:
-            raise RuntimeError(f"Failed to load image: {e}")
-
-        # Combine image and audio
-        video_clip = image_clip.set_audio(audio_clip)
-
-        # Export video
-        try:
-            video_clip.write_videofile(output_path, fps=24)
-        except Exception as e:
-            raise RuntimeError(f"Failed to write video: {e}")
+        engine_kwargs = {"workers": workers} if engine == "parallel" else {}
+        stats = VIDEO_ENGINES[engine](image_path, audio_path, output_path, extra_seconds=extra_seconds,
+                                      fps=fps or DEFAULT_FPS[engine], **engine_kwargs)
 
         print(f"Video successfully created: {output_path}")
+        return stats
 
     except FileNotFoundError as fnf_error:
         print(f"File error: {fnf_error}")
@@ -39,11 +308,19 @@ def create_video(image_path, audio_path, output_path, extra_seconds=2):
         print(f"Processing error: {run_error}")
     except Exception as e:
         print(f"Unexpected error: {e}")
+    return None
+
+def video_render_params(engine="still", extra_seconds=2, fps=None):
+    """
+    Everything besides the input files that changes the encoded bytes (used as a cache key).
+    """
+    codec = "moviepy-libx264" if engine == "moviepy" else " ".join(STILL_VIDEO_CODEC_ARGS)
+    return {"engine": engine, "extra_seconds": extra_seconds, "fps": fps or DEFAULT_FPS[engine], "codec": codec}
 
 # Example usage
 #create_video("input.jpg", "input.mp3", "output.mp4", extra_seconds=2)
 
-def create_video_with_default_paths(video_dir, input_audio_file, input_image_file):
+def create_video_with_default_paths(video_dir, input_audio_file, input_image_file, engine="still"):
     base_dir = os.path.dirname(os.path.abspath(__file__))
     input_dir = os.path.join(base_dir, '..', '..', 'data', video_dir)
     output_dir = os.path.join(base_dir, '..', '..', 'output', video_dir)
@@ -54,5 +331,4 @@ def create_video_with_default_paths(video_dir, input_audio_file, input_image_fil
     base_name = os.path.splitext(os.path.basename(input_audio_file))[0]
     output_name = f"{base_name}.mp4"
     output_path = os.path.join(output_dir, output_name)
-    create_video(input_image_path, input_audio_path, output_path, extra_seconds=2)
-
+    create_video(input_image_path, input_audio_path, output_path, extra_seconds=2, engine=engine)
@@ -1,20 +1,20 @@
 import time
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from Utilities.get_credentials import get_credentials
+from Utilities.youtube_client import get_youtube_client
 from Utilities.youtube_metadata_utilities import extract_metadata
 from Utilities.get_credentials import set_video_privacy
 
 # Assume you've already set up OAuth2 credentials with youtube.force-ssl scope
-default_creds = get_credentials()
-default_youtube = build("youtube", "v3", credentials=default_creds)
+# (loaded on first use by get_youtube_client(), not at import)
 
-def poll_for_autogen_captions(video_id, language="te", max_wait=600, interval=30, youtube=default_youtube):
+def poll_for_autogen_captions(video_id, language="te", max_wait=600, interval=30, youtube=None):
     """
     Poll until auto-generated captions are available.
     Returns caption_id if found, else None.
     """
+    youtube = youtube or get_youtube_client()
     waited = 0
     try:
         while waited < max_wait:
@@ -44,10 +44,11 @@ def poll_for_autogen_captions(video_id, language="te", max_wait=600, interval=30
         print(f"Unexpected error while polling captions: {e}")
         return None
 
-def download_captions(caption_id, output_file="captions.srt", youtube=default_youtube):
+def download_captions(caption_id, output_file="captions.srt", youtube=None):
     """
     Download captions by caption_id and save to file.
     """
+    youtube = youtube or get_youtube_client()
     try:
         caption_request = youtube.captions().download(id=caption_id)
         caption_response = caption_request.execute()
@@ -65,7 +66,7 @@ def download_captions(caption_id, output_file="captions.srt", youtube=default_yo
 
 def get_autogen_subs(creds, video_id, language="te", output_file="captions.srt", scheduleTime=None):
     #your_credentials = get_credentials()
-    youtube = build("youtube", "v3", credentials=creds)
+    youtube = get_youtube_client(creds)
     """
     Orchestrates polling and downloading auto-generated captions for a given video ID.
     """
@@ -0,0 +1,152 @@
+import re
+import json
+import time
+import random
+
+from Utilities.render_cache import unlink_output
+
+# Resumable upload endpoint of the YouTube Data API.
+YOUTUBE_UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+# Every chunk except the last must be a multiple of 256 KB.
+CHUNK_UNIT = 256 * 1024
+DEFAULT_STREAM_CHUNK_SIZE = 32 * CHUNK_UNIT  # 8 MB
+MAX_RETRIES = 10
+RETRIABLE_STATUS_CODES = [500, 502, 503, 504]
+
+# -------------------------------
+# Resumable protocol (unknown total size)
+# -------------------------------
+def start_resumable_session(session, body, upload_url=YOUTUBE_UPLOAD_URL, content_type="video/mp4"):
+    """
+    Opens a resumable upload session and returns its URI.
+    - session: a requests-style session (AuthorizedSession for YouTube, plain Session for tests)
+    """
+    response = session.post(
+        upload_url,
+        params={"uploadType": "resumable", "part": ",".join(body.keys())},
+        data=json.dumps(body),
+        headers={"Content-Type": "application/json; charset=UTF-8", "X-Upload-Content-Type": content_type},
+    )
+    if response.status_code != 200 or "Location" not in response.headers:
+        raise RuntimeError(f"Could not start upload session: HTTP {response.status_code} {response.text[:200]}")
+    return response.headers["Location"]
+
+def acknowledged_bytes(response):
+    """
+    Bytes the server has stored, from the Range header of a 308 response.
+    """
+    match = re.match(r"bytes=0-(\d+)", response.headers.get("Range", ""))
+    return int(match.group(1)) + 1 if match else 0
+
+def put_chunk(session, session_uri, data, offset, total=None, max_retries=MAX_RETRIES):
+    """
+    Sends bytes [offset, offset + len(data)) of a stream whose total is unknown ("*") until the last chunk.
+    Retries 5xx and connection errors with jittered exponential backoff.
+    """
+    total_text = str(total) if total is not None else "*"
+    if data:
+        content_range = f"bytes {offset}-{offset + len(data) - 1}/{total_text}"
+    else:
+        content_range = f"bytes */{total_text}"
+
+    for retry in range(max_retries + 1):
+        try:
+            response = session.put(session_uri, data=data, headers={"Content-Range": content_range})
+            if response.status_code not in RETRIABLE_STATUS_CODES:
+                return response
+            error = f"HTTP {response.status_code}"
+        except (ConnectionError, TimeoutError, OSError) as e:
+            error = f"{type(e).__name__}: {e}"
+        sleep_seconds = random.random() * min(64, 2 ** (retry + 1))
+        print(f"⚠️ {error}; retrying chunk in {sleep_seconds:.1f}s (attempt {retry + 1}/{max_retries})")
+        time.sleep(sleep_seconds)
+    raise RuntimeError(f"Chunk at byte {offset} failed after {max_retries} retries ({error})")
+
+def stream_upload(session, session_uri, stream, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, tee_path=None, check_complete=None):
+    """
+    Uploads a byte stream (e.g. encoder stdout) while it is still being produced.
+    - Sends every full chunk as soon as it is buffered; the total size is declared with the last one
+    - Bytes the server did not acknowledge are kept and re-sent
+    - tee_path optionally keeps a copy of the stream on disk
+    - check_complete() runs before the last chunk and may raise to avoid finalizing a truncated stream
+    - Returns the parsed JSON of the final response (the video resource for YouTube)
+    """
+    if chunk_size % CHUNK_UNIT:
+        raise ValueError(f"chunk_size must be a multiple of {CHUNK_UNIT} bytes")
+
+    if tee_path:
+        # The tee path may be a hard link into the render cache from an earlier run
+        unlink_output(tee_path)
+    tee = open(tee_path, "wb") if tee_path else None
+    buffer = bytearray()
+    offset = 0
+    started_at = time.perf_counter()
+    try:
+        eof = False
+        while True:
+            while not eof and len(buffer) < chunk_size:
+                data = stream.read(chunk_size - len(buffer))
+                if not data:
+                    eof = True
+                    break
+                buffer += data
+                if tee:
+                    tee.write(data)
+
+            if eof:
+                if check_complete:
+                    check_complete()
+                response = put_chunk(session, session_uri, bytes(buffer), offset, total=offset + len(buffer))
+                if response.status_code not in (200, 201):
+                    raise RuntimeError(f"Final chunk rejected: HTTP {response.status_code} {response.text[:200]}")
+                elapsed = max(time.perf_counter() - started_at, 1e-6)
+                total = offset + len(buffer)
+                print(f"⬆️ Streamed {total / 1024 ** 2:.1f} MB in {elapsed:.1f}s ({total / 1024 ** 2 / elapsed:.2f} MB/s)")
+                return response.json()
+
+            response = put_chunk(session, session_uri, bytes(buffer[:chunk_size]), offset)
+            if response.status_code != 308:
+                raise RuntimeError(f"Chunk rejected: HTTP {response.status_code} {response.text[:200]}")
+            acked = acknowledged_bytes(response)
+            if acked < offset:
+                raise RuntimeError(f"Server lost acknowledged bytes ({acked} < {offset}); restart the upload")
+            del buffer[:acked - offset]
+            offset = acked
+            elapsed = max(time.perf_counter() - started_at, 1e-6)
+            print(f"⬆️ {offset / 1024 ** 2:.1f} MB uploaded while encoding ({offset / 1024 ** 2 / elapsed:.2f} MB/s)")
+    finally:
+        if tee:
+            tee.close()
+
+# -------------------------------
+# Encode + upload
+# -------------------------------
+def stream_encode_and_upload(image, audio_path, body, session, extra_seconds=2, fps=1,
+                             tee_path=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, upload_url=YOUTUBE_UPLOAD_URL):
+    """
+    Encodes a fragmented MP4 and uploads it at the same time, so latency is
+    max(encode, upload) instead of encode + upload.
+    - image: file path or in-memory PIL frame
+    - body: the videos.insert resource (snippet/status)
+    - Returns the uploaded video resource
+    """
+    from VideoGenerate.video_generate import open_still_video_stream
+
+    session_uri = start_resumable_session(session, body, upload_url=upload_url)
+    process, media_seconds = open_still_video_stream(image, audio_path, extra_seconds=extra_seconds, fps=fps)
+
+    def check_encoder():
+        return_code = process.wait()
+        if return_code != 0:
+            stderr = process.stderr.read().decode("utf-8", errors="replace")
+            raise RuntimeError(f"Encoder failed ({return_code}): {stderr.strip()[-300:]}")
+
+    try:
+        response = stream_upload(session, session_uri, process.stdout, chunk_size=chunk_size,
+                                 tee_path=tee_path, check_complete=check_encoder)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    print(f"✅ Streamed {media_seconds:.0f}s video. Video ID: {response.get('id')}")
+    return response
@@ -1,69 +1,215 @@
 import os
+import re
+import json
+import time
+import random
 import argparse
+import httplib2
 
 
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
 
 from Utilities.get_credentials import get_credentials
+from Utilities.youtube_client import get_youtube_client
 from Utilities.youtube_metadata_utilities import extract_metadata
+from Utilities.quota_scheduler import record_api_call, mark_quota_exhausted, is_quota_exceeded_error
 
 # Scope defines the level of access we request.
 # Here: permission to upload videos to YouTube.
 
+# Chunk size must be a multiple of 256 KB for resumable uploads.
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_RETRIES = 10
+RETRIABLE_STATUS_CODES = [500, 502, 503, 504]
+RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, ConnectionError, TimeoutError)
+
+# -------------------------------
+# Resumable session persistence
+# -------------------------------
+def session_file_for(video_path):
+    return f"{video_path}.upload_session.json"
+
+def load_upload_session(video_path):
+    """
+    Returns the saved resumable session URI if it belongs to this exact file, else None.
+    """
+    path = session_file_for(video_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            session = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    stat = os.stat(video_path)
+    if session.get("size") != stat.st_size or session.get("mtime") != stat.st_mtime:
+        return None
+    return session.get("resumable_uri")
+
+def save_upload_session(video_path, resumable_uri):
+    stat = os.stat(video_path)
+    with open(session_file_for(video_path), "w", encoding="utf-8") as f:
+        json.dump({"resumable_uri": resumable_uri, "size": stat.st_size, "mtime": stat.st_mtime}, f)
+
+def clear_upload_session(video_path):
+    if os.path.exists(session_file_for(video_path)):
+        os.remove(session_file_for(video_path))
+
+# -------------------------------
+# Chunk loop
+# -------------------------------
+def format_progress(sent_bytes, total_bytes, started_at, resumed_from):
+    elapsed = max(time.perf_counter() - started_at, 1e-6)
+    rate = (sent_bytes - resumed_from) / elapsed
+    eta = (total_bytes - sent_bytes) / rate if rate > 0 else float("inf")
+    return (f"⬆️ {sent_bytes / 1024 ** 2:.1f}/{total_bytes / 1024 ** 2:.1f} MB "
+            f"({100 * sent_bytes / total_bytes:.0f}%) at {rate / 1024 ** 2:.2f} MB/s, ETA {eta:.0f}s")
+
+def query_upload_status(request, total_bytes):
+    """
+    Asks the server how much of the session it has (PUT "Content-Range: bytes */<size>", as stream_upload does)
+    and moves request.resumable_progress there so next_chunk continues from that byte.
+    - Returns the videos.insert response when the upload had already completed, else None
+    - 5xx / 404 come back as HttpError like any other chunk
+    """
+    resp, content = request.http.request(request.resumable_uri, method="PUT", body=b"",
+                                         headers={"Content-Range": f"bytes */{total_bytes}", "Content-Length": "0"})
+    if resp.status in (200, 201):
+        return json.loads(content)
+    if resp.status != 308:
+        raise HttpError(resp, content, uri=request.resumable_uri)
+    match = re.match(r"bytes=0-(\d+)", resp.get("range", ""))
+    request.resumable_progress = int(match.group(1)) + 1 if match else 0
+    return None
+
+def execute_resumable(request, video_path, max_retries=MAX_RETRIES):
+    """
+    Drives a resumable insert chunk by chunk.
+    - Persists the session URI so a restarted run continues from the last acknowledged byte
+    - Retries 5xx responses and connection errors with jittered exponential backoff,
+      asking the server for the acknowledged offset before sending again
+    - Prints throughput and ETA after every chunk
+    """
+    total_bytes = os.path.getsize(video_path)
+    saved_uri = load_upload_session(video_path)
+    needs_status = False
+    if saved_uri:
+        print("🔁 Resuming previous upload session")
+        request.resumable_uri = saved_uri
+        needs_status = True
+
+    started_at = time.perf_counter()
+    resumed_from = None
+    response = None
+    retry = 0
+    while response is None:
+        try:
+            if needs_status:
+                response = query_upload_status(request, total_bytes)
+                needs_status = False
+                if resumed_from is None:
+                    resumed_from = request.resumable_progress
+                if response is not None:
+                    break
+            status, response = request.next_chunk()
+            if request.resumable_uri and request.resumable_uri != saved_uri:
+                saved_uri = request.resumable_uri
+                save_upload_session(video_path, saved_uri)
+            if status:
+                if resumed_from is None:
+                    resumed_from = max(0, status.resumable_progress - request.resumable.chunksize())
+                print(format_progress(status.resumable_progress, total_bytes, started_at, resumed_from))
+            retry = 0
+        except HttpError as e:
+            if e.resp.status not in RETRIABLE_STATUS_CODES:
+                if e.resp.status == 404:
+                    # Session expired on the server side; the next run starts a new one
+                    clear_upload_session(video_path)
+                raise
+            needs_status = bool(request.resumable_uri)
+            error = f"HTTP {e.resp.status}"
+        except RETRIABLE_EXCEPTIONS as e:
+            needs_status = bool(request.resumable_uri)
+            error = f"{type(e).__name__}: {e}"
+        else:
+            continue
+
+        retry += 1
+        if retry > max_retries:
+            raise RuntimeError(f"Upload failed after {max_retries} retries ({error})")
+        sleep_seconds = random.random() * min(64, 2 ** retry)
+        print(f"⚠️ {error}; retrying in {sleep_seconds:.1f}s (attempt {retry}/{max_retries})")
+        time.sleep(sleep_seconds)
+
+    clear_upload_session(video_path)
+    return response
+
 # -------------------------------
 # Upload Function
 # -------------------------------
-def upload_video(video_path, metadata, creds):
+def build_video_body(metadata):
+    """
+    videos.insert resource (snippet + status) for the extracted metadata.
+    """
+    body = {
+        "snippet": {
+            "title": metadata["title"],
+            "description": metadata["description"],
+            "tags": metadata["tags"],
+            "categoryId": metadata["categoryId"],
+            "defaultAudioLanguage": metadata.get("defaultAudioLanguage")
+        },
+        "status": {
+            "privacyStatus": metadata["privacyStatus"]
+        }
+    }
+
+    # Add scheduling if publishAt is provided
+    if metadata.get("publishAt"):
+        body["status"]["publishAt"] = metadata["publishAt"]
+    return body
+
+def upload_video(video_path, metadata, creds, chunk_size=DEFAULT_CHUNK_SIZE, max_retries=MAX_RETRIES):
     """
     Uploads a video to YouTube using metadata.
     - Handles missing files and API errors gracefully
     - Supports scheduling via IST → UTC conversion
     - Supports setting default video language
+    - Uploads in chunk_size pieces with retries and resumes an interrupted session
     """
-    
+
     #if not metadata:
     #    return
 
     if not creds:
         return
 
+    response = None
     try:
-        youtube = build("youtube", "v3", credentials=creds)
+        youtube = get_youtube_client(creds)
 
         # Build request body
-        body = {
-            "snippet": {
-                "title": metadata["title"],
-                "description": metadata["description"],
-                "tags": metadata["tags"],
-                "categoryId": metadata["categoryId"],
-                "defaultAudioLanguage": metadata.get("defaultAudioLanguage")
-            },
-            "status": {
-                "privacyStatus": metadata["privacyStatus"]
-            }
-        }
-
-        # Add scheduling if publishAt is provided
-        if metadata.get("publishAt"):
-            body["status"]["publishAt"] = metadata["publishAt"]
+        body = build_video_body(metadata)
 
         # Prepare upload request
         request = youtube.videos().insert(
             part="snippet,status",
             body=body,
-            media_body=MediaFileUpload(video_path, chunksize=-1, resumable=True)
+            media_body=MediaFileUpload(video_path, chunksize=chunk_size, resumable=True)
         )
 
-        # Execute upload
-        response = request.execute()
+        # Execute upload (a resumed session was already charged when it started)
+        if not load_upload_session(video_path):
+            record_api_call("videos.insert")
+        response = execute_resumable(request, video_path, max_retries=max_retries)
         print("✅ Upload complete. Video ID:", response["id"])
 
     except FileNotFoundError:
         print(f"❌ Video file {video_path} not found.")
     except HttpError as e:
+        if is_quota_exceeded_error(e):
+            mark_quota_exhausted()
         print("❌ YouTube API error:", e)
     except Exception as e:
         print("❌ Unexpected error:", e)
@@ -79,6 +225,7 @@ if __name__ == "__main__":
     parser.add_argument("song_name", help="Path to the song (e.g., output.mp4)")
     parser.add_argument("video_name", help="Path to the video file (e.g., output.mp4)")
     parser.add_argument("metadata_file_name", help="Path to the metadata JSON file (e.g., video_metadata.json)")
+    parser.add_argument("--chunk_mb", type=int, default=DEFAULT_CHUNK_SIZE // 1024 ** 2, help="Upload chunk size in MB (default: 8).")
     args = parser.parse_args()
 
     output_rel_dir = os.path.join('..', '..', 'output', args.song_name)
@@ -87,5 +234,5 @@ if __name__ == "__main__":
     metadata_file = os.path.join(data_rel_dir, args.metadata_file_name)
     creds = get_credentials()
     metadata = extract_metadata(metadata_file=metadata_file, data_rel_dir=data_rel_dir)
-    upload_video(video_path=video_path, metadata=metadata, creds=creds)
-    #upload_video(video_path=video_path, metadata_file=metadata_file, data_rel_dir=data_rel_dir)
\ No newline at end of file
+    upload_video(video_path=video_path, metadata=metadata, creds=creds, chunk_size=args.chunk_mb * 1024 ** 2)
+    #upload_video(video_path=video_path, metadata_file=metadata_file, data_rel_dir=data_rel_dir)
@@ -1,107 +1,79 @@
 import sys
 import os
 import argparse
-from ImageProcesser.image_resize import convert_image_for_youtube
-from VideoGenerate.video_generate import create_video
-from YouTubeUpload.youtube_upload import upload_video
-from SubtitleHandler.subtitle_autogen_downloader import get_autogen_subs
-from Utilities.get_credentials import get_credentials
-from Utilities.youtube_metadata_utilities import extract_metadata
-from SubtitleHandler.subtitle_generator import generate_subtitles_with_model
-from Utilities.youtube_set_get import upload_subtitles
+from Pipeline.song_job import STAGES, build_song_job, discover_songs, plan_song_stages, run_stages, stage_quota_cost
+from Pipeline.batch_runner import default_worker_count
+# Everything heavier (moviepy, PIL, googleapiclient, google.genai, credentials) is imported
+# by the stage that needs it, so --help and single-stage runs start quickly.
 
 
 
 def main():
     parser = argparse.ArgumentParser(description="Upload a video to YouTube with metadata.")
-    parser.add_argument("song_name", help="The name of the video upload, to help with data and output paths.")
+    parser.add_argument("song_name", nargs="*", help="The name(s) of the video upload, to help with data and output paths. Several names run in batch mode.")
+    parser.add_argument("--all", action="store_true", help="Batch mode: process every song folder under data/.")
+    parser.add_argument("--workers", type=int, default=default_worker_count(), help="Worker processes for image/video encoding in batch mode (default: CPU count - 1).")
+    parser.add_argument("--pipeline", action="store_true", help="Batch mode: overlap songs across stages (encode song N+1 while song N uploads and waits for captions).")
     parser.add_argument("--audio_file_name",help="Name of the  audio file (e.g., input.mp3)")
     parser.add_argument("--image_file_name", help="Name of the image file (e.g., input.jpg)")
     parser.add_argument("--metadata_file_name", help="Name of the json meta data file for youtube upload (e.g., video_metadata.json)")
 
     #lyrics, prompt file name
-    #I must give default values here to avoid breaking existing usage. How??
     parser.add_argument("--lyrics_file_name", help="Name of the lyrics file for subtitle generation (e.g., english_for_telugu_lyrics.txt)")
     parser.add_argument("--prompt_file_name", help="Name of the prompt instructions file for subtitle generation (e.g., subtitle_generator_prompt.txt)")
+    parser.add_argument("--subtitle_engine", choices=["align", "llm"], default="align", help="'align' times the lyrics against the captions locally and only asks Gemini when the alignment is low-confidence (default); 'llm' always uses Gemini.")
+    parser.add_argument("--video_engine", choices=["still", "parallel", "moviepy"], default="still", help="Video encoder: 'still' encodes the image once with ffmpeg (default), 'parallel' splits long tracks across processes, 'moviepy' renders every frame.")
+    parser.add_argument("--image_fit", choices=["stretch", "letterbox", "crop"], default="stretch", help="How the picture is fitted to 1280x720 when its aspect ratio differs (default: stretch).")
+    parser.add_argument("--write_frame_jpeg", action="store_true", help="Also save the resized frame as output/<song>/<image>_yt.jpg (e.g. for a thumbnail); the encoder always gets it in memory.")
+    parser.add_argument("--video_workers", type=int, help="Chunk encoders for --video_engine parallel (default: CPU count).")
+    parser.add_argument("--from-stage", "--from_stage", dest="from_stage", choices=STAGES, help="Re-run this stage and every stage after it, ignoring the manifest.")
+    parser.add_argument("--only-stage", "--only_stage", dest="only_stage", choices=STAGES, help="Run just this stage (uses the video_id from the manifest).")
+    parser.add_argument("--stream_upload", action="store_true", help="Upload the video while it is being encoded (fragmented MP4, still engine); a copy is still written to output/<song>/.")
+    parser.add_argument("--ignore_quota", action="store_true", help="Run even if the remaining YouTube API quota looks too small.")
+    parser.add_argument("--no_cache", action="store_true", help="Always re-render the image and video instead of reusing the render cache.")
+    parser.add_argument("--stream_llm", action="store_true", help="Stream the Gemini response and write each subtitle cue as soon as it is complete.")
+    parser.add_argument("--llm_window_seconds", type=int, help="Regenerate subtitles as overlapping windows of this many seconds, several Gemini calls at a time (for long tracks).")
+    parser.add_argument("--prompt_encoding", choices=["compact", "srt"], default="srt", help="How captions are sent to Gemini: 'srt' is the full SRT (default), 'compact' (experimental) sends one line per cue with relative centisecond timings and asks back absolute centisecond starts. Token counts and latency go to output/<song>/llm_usage.jsonl.")
+    parser.add_argument("--caption_languages", nargs="+", default=["en"], help="Caption tracks to build and upload in parallel: 'iast' (Telugu IAST only), 'en' (IAST + English meaning) and language codes such as 'hi' (IAST + translated meaning). Default: en. Adding a language reruns regenerate_subtitles for it.")
+    parser.add_argument("--no_llm_cache", action="store_true", help="Always call Gemini instead of reusing a cached response for the same model and prompt.")
 
     args = parser.parse_args()
-
-    if not args.audio_file_name:
-        args.audio_file_name = f"audio.mp3"
-    if not args.image_file_name:
-        args.image_file_name = f"image.png"
-    if not args.metadata_file_name:
-        args.metadata_file_name = f"metadata.json"
-    if not args.lyrics_file_name:
-        args.lyrics_file_name = f"lyrics.txt"
-    if not args.prompt_file_name:
-        args.prompt_file_name = f"subtitle_generator_prompt.txt"
-
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    rel_data_dir = os.path.join(script_dir, '..', 'data', args.song_name)
-    rel_output_dir = os.path.join(script_dir, '..', 'output', args.song_name)
-    os.makedirs(rel_output_dir, exist_ok=True)
-    
-
-    # Set full paths for input data
-    args.input_audio_file = os.path.join(rel_data_dir, args.audio_file_name)
-    args.input_image_file = os.path.join(rel_data_dir, args.image_file_name)
-    args.input_metadata_file = os.path.join(rel_data_dir, args.metadata_file_name)
-    args.input_lyrics_file = os.path.join(rel_data_dir, args.lyrics_file_name)
-    args.input_prompt_file = os.path.join(script_dir, args.prompt_file_name)
-
-    base_audio_name = os.path.splitext(os.path.basename(args.audio_file_name))[0]
-    base_image_name = os.path.splitext(os.path.basename(args.image_file_name))[0]
-
-    # Set full paths for output data
-    output_image_name = f"{base_image_name}_yt.jpg"
-    args.output_image_file = os.path.join(rel_output_dir, output_image_name )
-    
-    output_video_name = f"{args.song_name}.mp4"
-    output_video_file = os.path.join(rel_output_dir, output_video_name)
-    downloaded_captions_file_name = f"{args.song_name}_downloaded_captions.srt"
-    downloaded_captions_file = os.path.join(rel_output_dir, downloaded_captions_file_name)
-    regenerated_captions_file_en_name = f"{args.song_name}_regenerated_en_captions.srt"
-    regenerated_captions_file_en =  os.path.join(rel_output_dir, regenerated_captions_file_en_name)
-
-
-    # Step 1: Convert image for YouTube
-    print("Converting image for YouTube...")
-    convert_image_for_youtube(input_image=args.input_image_file, output_image=args.output_image_file)
-    # Step 2: Create video from image and audio
-    print("Creating video from image and audio...")
-    create_video(image_path=args.output_image_file, audio_path=args.input_audio_file, output_path=output_video_file, extra_seconds=2)
-    # Step 3: Upload video to YouTube
-    print("Uploading video to YouTube...")
-    creds = get_credentials()
-    
-    metadata = extract_metadata(metadata_file=args.input_metadata_file, data_rel_dir=rel_data_dir)
-    response = upload_video(video_path=output_video_file, metadata=metadata, creds=creds)
-
-
-    # Step 4: Download auto-generated subtitles
-    print("Downloading auto-generated subtitles...")
-    if response and "id" in response:
-        video_id = response["id"]
-        get_autogen_subs(creds, video_id=video_id, language="te", output_file=downloaded_captions_file, metadata=metadata)
-    else:
-        print("Video upload failed; skipping subtitle download.")
-
-    #Step 5: (Optional) Regenerate subtitles using Gemini model
-    print("Regenerating subtitles using Gemini model...")
-    generate_subtitles_with_model(
-        model_name="gemini-2.5-flash",
-        srt_file=downloaded_captions_file,
-        lyrics_file=args.input_lyrics_file,
-        prompt_file=args.input_prompt_file,
-        output_file=regenerated_captions_file_en
-    )
-
-    #Step 6 : upload the regenerated subtitles back to youtube with en language
-    print("Uploading regenerated subtitles to YouTube...")
-    if response and "id" in response:
-        video_id = response["id"]
-        upload_subtitles(video_id=video_id, srt_file=regenerated_captions_file_en, language="en", name="English Subtitles", creds=creds)
+    options = vars(args)
+
+    song_names = discover_songs() if args.all else args.song_name
+    if not song_names:
+        parser.error("give at least one song_name, or --all")
+
+    # Batch mode: encode in a process pool (optionally pipelined), isolate failures, print a summary table
+    if len(song_names) > 1 or args.all:
+        from Pipeline.batch_runner import run_batch
+        from Pipeline.staged_pipeline import run_pipelined_batch
+        if args.pipeline:
+            results = run_pipelined_batch(song_names, options=options, workers={"encode": args.workers})
+        else:
+            results = run_batch(song_names, options=options, workers=args.workers)
+        return 0 if all(r["status"] in ("ok", "done", "deferred") for r in results) else 1
+
+    # Single song: resume from the first incomplete stage in this process
+    job = build_song_job(song_names[0], options)
+    os.makedirs(job["output_dir"], exist_ok=True)
+    stages = plan_song_stages(job, args.from_stage, args.only_stage)
+    if not stages:
+        print(f"✅ {job['song_name']}: all stages are up to date (use --from-stage to force a rerun)")
+        return 0
+    if not args.ignore_quota:
+        from Utilities.quota_scheduler import remaining_quota
+        cost, remaining = stage_quota_cost(stages, job), remaining_quota()
+        if cost > remaining:
+            print(f"⏸️ {job['song_name']} needs {cost} quota units but only {remaining} are left today; "
+                  f"rerun after the quota resets (midnight Pacific) or pass --ignore_quota")
+            return 1
+    print(f"Running stages: {', '.join(stages)}")
+    _, _, error = run_stages(job, stages)
+    if error:
+        print(f"❌ {job['song_name']} failed at {error}")
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
@@ -111,4 +83,4 @@ if __name__ == "__main__":
         print(f"Error: {e}")
         input("Press Enter to exit...")
     '''
-   main()
\ No newline at end of file
+   sys.exit(main())